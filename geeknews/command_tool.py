@@ -16,9 +16,11 @@ from geeknews.configparser import GeeknewsConfigParser
 from geeknews.config import GeeknewsEmailConfig, GeeknewsWechatPPConfig
 
 from geeknews.hackernews.config import HackernewsConfig
-from geeknews.hackernews.api_client import HackernewsClient, HN_MAX_DOWNLOADS, HN_RECENT_HOURS
+from geeknews.hackernews.api_client import HackernewsClient, HN_RECENT_HOURS
 from geeknews.hackernews.article_editor import count_words
 from geeknews.hackernews.data_path import HackernewsDataPathManager
+from geeknews.hackernews.item_store import migrate_json_items
+from geeknews.hackernews.backfill import HackernewsBackfill
 from geeknews.hackernews.manager import HackernewsManager
 
 from geeknews.manager import GeeknewsManager    
@@ -42,7 +44,10 @@ class GeeknewsCommandHandler:
         hackernews_parser = subparsers.add_parser('hackernews', help='Hacker News top stories')
         hackernews_parser.add_argument('--run', action='store_true', help='是否获取每日热点并生成总结报告')
         hackernews_parser.add_argument('--fetch', action='store_true', help='是否获取每日热点')
+        hackernews_parser.add_argument('--backfill', help='按日期范围重建报告: START..END, e.g. 2025-01-01..2025-01-31')
         hackernews_parser.add_argument('--clean-cache', action='store_true', help='清理本地缓存的story数据')
+        hackernews_parser.add_argument('--migrate-items', action='store_true', help='把按日期保存的story json文件迁移到item store')
+        hackernews_parser.add_argument('--remove-migrated', action='store_true', help='迁移后删除已成功导入的json文件')
         hackernews_parser.add_argument('--download', help='下载文章链接')
         hackernews_parser.add_argument('--read', help='读取文章内容')
         hackernews_parser.add_argument('--read-sum', help='读取文章摘要')
@@ -123,15 +128,30 @@ class GeeknewsCommandHandler:
             story_dir = hackernews_dpm.get_story_date_dir(date)
             story_ids = hackernews_manager.api_client.fetch_top_story_ids()
             story_ids = hackernews_manager.api_client.custom_rank_ids(story_ids, date=date, priority=True)
+            stories = hackernews_manager.api_client.get_local_items(story_ids, date)
             for index, id in enumerate(story_ids):
-                story_path = hackernews_dpm.get_story_file_path(id, date)
-                with open(story_path) as f:
-                    story = json.load(f)
-                    self.debug_log_story(story, index)
+                if id in stories:
+                    self.debug_log_story(stories[id], index)
+
+        elif args.backfill:
+            start_text, _, end_text = args.backfill.partition('..')
+            start_date = GeeknewsDate.parse(start_text)
+            end_date = GeeknewsDate.parse(end_text) if end_text else start_date
+            if not start_date or not end_date:
+                print(f"日期范围格式错误: {args.backfill}")
+                return
+            backfill = HackernewsBackfill(hackernews_manager.config, hackernews_dpm)
+            results = backfill.run(start_date, end_date, locale)
+            print(backfill.format_results(results))
 
         elif args.clean_cache:
             hackernews_manager.api_client.clean_local_items(date)
 
+        elif args.migrate_items:
+            item_store = hackernews_dpm.get_item_store()
+            count = migrate_json_items(hackernews_dpm, item_store, remove_files=args.remove_migrated)
+            print(f"迁移完成, 数量: {count}")
+
         elif args.download:
             url = args.download
             text = hackernews_manager.article_editor.get_text_from_url_by_curl_impersonate(url)
@@ -149,12 +169,18 @@ class GeeknewsCommandHandler:
             print(f"Download finish: {path}")
 
         elif args.read:
+            # story id (read from item store) or story json path
             story_path = args.read
-            content = hackernews_manager.article_editor.download_article_content_by_story_path(story_path)
-            if content:
+            if story_path.isdigit():
+                content = hackernews_manager.article_editor.download_article_content_by_story_id(story_path, date)
+                story_dir = hackernews_dpm.get_story_date_dir(date)
+                temp_name = story_path
+            else:
+                content = hackernews_manager.article_editor.download_article_content_by_story_path(story_path)
                 story_dir = os.path.dirname(story_path)
                 story_name = os.path.basename(story_path)
                 temp_name, _ = os.path.splitext(story_name)
+            if content:
                 temp_path = os.path.join(story_dir, f'temp_article_{temp_name}.md')
                 with open(temp_path, 'w') as f:
                     f.write(content)
@@ -220,10 +246,13 @@ class GeeknewsCommandHandler:
             # validate
             if not debug and short_articles:
                 print("=======")
+                short_articles = [a for a in short_articles if not a[0].startswith("Show HN:") and not a[0].startswith("Ask HN:")]
+                # many articles are scored in one request
+                scores = hackernews_manager.article_editor.relevance_checker.check_scores(
+                    [(file_path, title, content) for title, content, file_path, _ in short_articles]
+                )
                 for title, content, file_path, word_count in short_articles:
-                    if title.startswith("Show HN:") or title.startswith("Ask HN:"):
-                        continue
-                    score = hackernews_manager.article_editor.check_article_relevance_score(title, content)
+                    score = scores.get(file_path, 0)
                     failed = score < hackernews_manager.config.validation_score
                     invalid_mark = "[FAILED]" if failed else ""
                     print(f"{file_path} [{word_count}] 关联性评价得分: {score}, {invalid_mark} {title[:50]}")
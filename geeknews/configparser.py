@@ -23,6 +23,10 @@ class GeeknewsConfigParser:
         value = self.get(section, key)
         return int(value)
 
+    def get_float(self, section, key):
+        value = self.get(section, key)
+        return float(value)
+
     def get_bool(self, section, key):
         value = self.get(section, key)
         if value == 'true' or value == 'True' or value == '1':
@@ -95,6 +95,10 @@ def start_process():
         geeknews_manager,
     )
 
+    # 持续跟踪热点, 定时任务可以直接使用预热的数据
+    if geeknews_manager.hackernews_config.live_subscribe:
+        geeknews_manager.hackernews_manager.start_subscriber()
+
     try:
         while True:
             schedule.run_pending()
@@ -1,18 +1,23 @@
 import os
 import re
-import requests
-import json
 import aiohttp
-import aiofiles
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 from geeknews.hackernews.config import HackernewsConfig
 from geeknews.hackernews.data_path import HackernewsDataPathManager
+from geeknews.hackernews.daily_edition import HackernewsDailyEdition
+from geeknews.hackernews.item_cache import HackernewsItemCache
+from geeknews.hackernews.fetch_policy import HackernewsFetcher
+from geeknews.hackernews import ranking
+from geeknews.hackernews.ranking import HackernewsRankingEngine
+from geeknews.hackernews.scorer import HackernewsStoryScorer
+from geeknews.hackernews.comment_selector import HackernewsCommentSelector
 from geeknews.utils.logger import LOG
 from geeknews.utils.date import GeeknewsDate
+from geeknews.utils import codec
 
 
-HN_MAX_DOWNLOADS = 100
 HN_RECENT_HOURS = 24
 
 
@@ -42,6 +47,10 @@ class HackernewsApi:
     def job_stories_url(self):
         return self.get_stories_url('jobstories')
     
+    def updates_url(self):
+        '''changed items and profiles'''
+        return f"{self.base_url}/updates.json"
+    
     def get_item_url(self, id):
         return f"{self.base_url}/item/{id}.json"
     
@@ -55,18 +64,22 @@ class HackernewsClient:
         self.api = HackernewsApi()
         self.config = config
         self.datapath_manager = datapath_manager
-        self.job_title_re = re.compile(r'\(YC\s\w\d+\)\s\w+\s[Hh]iring')
+        self.item_cache = HackernewsItemCache(config, datapath_manager.get_item_store())
+        self.fetcher = HackernewsFetcher(config)
+        self.scorer = HackernewsStoryScorer(config)
+        self.aio_session = None
+        self.aio_semaphore = None
+        self.subscriber = None
 
     def http_get(self, url, empty_data=[]):
-        response = requests.get(url)
-        try:
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            LOG.error(str(e))
-            return empty_data
+        return self.fetcher.get_json(url, empty_data)
     
     def fetch_top_story_ids(self):
+        # use warm data from live subscriber if available
+        if self.subscriber:
+            story_ids = self.subscriber.get_top_story_ids()
+            if story_ids:
+                return story_ids
         return self.http_get(self.api.top_stories_url(), empty_data=[])
     
     def fetch_new_story_ids(self):
@@ -75,16 +88,22 @@ class HackernewsClient:
     def fetch_item(self, id):
         url = self.api.get_item_url(id)
         return self.http_get(url, empty_data={})
+    
+    def fetch_updated_item_ids(self):
+        updates = self.http_get(self.api.updates_url(), empty_data={})
+        if not isinstance(updates, dict):
+            return []
+        return updates.get('items', [])
         
     def get_item(self, id, item_type='story', parent_id=None, recursive=False, remain_comment_count=10, current_num=0, mark_article=False, date=GeeknewsDate.now()):
-        item = self.get_local_item(id, date)
+        items, download_ids = self.get_cached_items([id], date)
         
-        if not item:
+        if download_ids:
             action_log = '开始下载'
-            item = self.fetch_item(id)
-            self.save_item(id, item, date)
+            items = self.save_downloaded_items({id: self.fetch_item(id)}, date)
         else:
             action_log = '本地读取'
+        item = items.get(id, {})
 
         parent_log = f'源自{parent_id}, ' if parent_id else ''
         article_log = f'精读文章' if mark_article else ''
@@ -97,46 +116,35 @@ class HackernewsClient:
         if 'kids' not in item:
             return item
         
-        comment_ids = item['kids']
-        real_comment_count = len(comment_ids)
-        LOG.debug(f'获取{id}的评论剩余数量: {remain_comment_count}, 实际评论数量: {real_comment_count}')
-        
-        if remain_comment_count <= 0:
-            comment_ids = []
-        elif remain_comment_count < real_comment_count:
-            comment_ids = comment_ids[:remain_comment_count]
-            remain_comment_count = 0
-        elif remain_comment_count > real_comment_count:
-            remain_comment_count -= real_comment_count
-        elif remain_comment_count == real_comment_count:
-            remain_comment_count = 0
-        
-        comments = []
-        for index, comment_id in enumerate(comment_ids):
-            comment = self.get_item(
-                id=comment_id,
-                item_type='comment',
-                parent_id=id,
-                recursive=True,
-                remain_comment_count=remain_comment_count,
-                current_num=index+1,
-                mark_article=False,
-                date=date,
-            )
-            comments.append(comment)
-
-        del item['kids']
-        if comments:
-            item['comments'] = comments
-        
-        return item
-    
-    def fetch_daily_stories(self, date=GeeknewsDate.now()):
-        # fetch and save top stories json
+        return self.get_comments(item, remain_comment_count, date)
+
+    def get_comments(self, item, remain_comment_count, date=GeeknewsDate.now()):
+        '''Select comments of item breadth first, fetch only candidates within remaining comment count.'''
+        selector = HackernewsCommentSelector(item, remain_comment_count)
+        comment_ids = selector.next_ids()
+        while comment_ids:
+            items, download_ids = self.get_cached_items(comment_ids, date)
+            if download_ids:
+                items.update(self.save_downloaded_items({id: self.fetch_item(id) for id in download_ids}, date))
+            selector.add_items(items)
+            comment_ids = selector.next_ids()
+        return selector.build()
+    
+    def fetch_daily_stories(self, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        '''Fetch and save top stories json, return daily edition with ranked stories (sync mode, see aio_fetch_daily_stories).'''
+        self.fetcher.stats.reset()
         stories = self.fetch_top_stories(date)
+        LOG.info(f'获取stories结束: {self.fetcher.stats.summary()}')
+        return self.save_daily_stories(stories, date, edition)
+    
+    def save_daily_stories(self, stories, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        '''Save top stories and short stories json, and fill them to daily edition.'''
+        if edition is None:
+            edition = HackernewsDailyEdition(date)
+        
         stories_file_path = self.datapath_manager.get_stories_file_path(name='topstories', date=date)
         with open(stories_file_path, 'w') as f:
-            json.dump(stories, f, ensure_ascii=False, indent=4)
+            codec.dump(stories, f, indent=True)
 
         # filter stories which are not marked as articles, and save to json list
         short_stories = []
@@ -157,9 +165,12 @@ class HackernewsClient:
         if short_stories:
             short_stories_path = os.path.join(story_date_dir, 'short_stories.json')
             with open(short_stories_path, 'w') as f:
-                json.dump(short_stories, f, ensure_ascii=False, indent=4)
+                codec.dump(short_stories, f, indent=True)
         
+        edition.stories = stories
+        edition.short_stories = short_stories
         LOG.debug(f'完成获取stories: {story_date_dir}')
+        return edition
 
     def fetch_top_stories(self, date=GeeknewsDate.now()):
         story_limit = self.config.daily_story_max_count
@@ -191,17 +202,20 @@ class HackernewsClient:
             items.append(item)
         return items
     
-    def get_story_id_with_highest_score(self, category='topstories', article_only=True, date=GeeknewsDate.now()):
+    def get_story_id_with_highest_score(self, category='topstories', article_only=True, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
         # default implementation: 
         # get topstories.json, look for story with both highest score and marked article
 
-        story_list_path = self.datapath_manager.get_stories_file_path(name=category, date=date)
-        if not os.path.exists(story_list_path):
-            LOG.error('搜索最高分热点失败: 找不到topstories.json')
-            return -1
-        
-        with open(story_list_path) as f:
-            stories = json.load(f)
+        if edition is not None and category == 'topstories':
+            stories = edition.stories
+        else:
+            story_list_path = self.datapath_manager.get_stories_file_path(name=category, date=date)
+            if not os.path.exists(story_list_path):
+                LOG.error('搜索最高分热点失败: 找不到topstories.json')
+                return -1
+            
+            with open(story_list_path) as f:
+                stories = codec.load(f)
 
         if not isinstance(stories, list) or not stories:
             LOG.error('搜索最高分热点失败: 没有热点数据')
@@ -226,87 +240,241 @@ class HackernewsClient:
         
         return found_story_id
     
+    @property
+    def item_store(self):
+        return self.datapath_manager.get_item_store()
+    
     def get_local_item(self, id, date=GeeknewsDate.now()):
-        story_path = self.get_story_path(id, date)
-        if os.path.exists(story_path):
-            with open(story_path) as f:
-                return json.load(f)
-        return {}
+        return self.item_store.get(id, date)
+    
+    def get_local_items(self, ids, date=GeeknewsDate.now()):
+        return self.item_store.get_many(ids, date)
     
     def save_item(self, id, item, date=GeeknewsDate.now()):
-        story_path = self.get_story_path(id, date)
-        story_dir = os.path.dirname(story_path)
-        if not os.path.exists(story_dir):
-            os.makedirs(story_dir)
-        with open(story_path, 'w') as f:
-            json.dump(item, f, ensure_ascii=False)
+        self.item_store.save(id, item, date)
+    
+    def get_cached_items(self, ids, date=GeeknewsDate.now()):
+        '''Read items from local date store, then from fresh global cache. Return (items, ids to download).'''
+        items = self.get_local_items(ids, date)
+        missing_ids = [id for id in ids if id not in items]
+        
+        cached_items = self.item_cache.get_fresh_items(missing_ids)
+        self.item_store.save_many(cached_items, date)
+        items.update(cached_items)
+        
+        download_ids = [id for id in missing_ids if id not in cached_items]
+        return items, download_ids
+    
+    def save_downloaded_items(self, downloaded_items: dict, date=GeeknewsDate.now()):
+        '''Refresh global cache with downloaded items, then save them to local date store.'''
+        items = self.item_cache.refresh(downloaded_items)
+        self.item_store.save_many(items, date)
+        return items
 
-    def get_story_path(self, id, date=GeeknewsDate.now()):
-        return self.datapath_manager.get_story_file_path(id, date)
+    async def aio_get_cached_items(self, ids, date=GeeknewsDate.now()):
+        '''Same as get_cached_items, item store is read in a thread so event loop is not blocked by sqlite.'''
+        return await asyncio.to_thread(self.get_cached_items, ids, date)
+
+    async def aio_save_downloaded_items(self, downloaded_items: dict, date=GeeknewsDate.now()):
+        return await asyncio.to_thread(self.save_downloaded_items, downloaded_items, date)
 
     @staticmethod
     def get_default_story_url(story_id):
         return f'https://news.ycombinator.com/item?id={story_id}'
     
-    async def fetch_url(self, url):
+    async def aio_open_session(self):
+        '''Create the pooled session (keep-alive) shared by all HN api requests in current event loop.'''
+        if self.aio_session and not self.aio_session.closed:
+            return self.aio_session
+        
+        connector = aiohttp.TCPConnector(
+            limit=self.config.story_fetch_max_concurrency,
+            limit_per_host=self.config.story_fetch_max_per_host,
+            keepalive_timeout=60,
+        )
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=self.config.story_fetch_connect_timeout,
+            sock_read=self.config.story_fetch_read_timeout,
+        )
+        self.aio_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        self.aio_semaphore = asyncio.Semaphore(self.config.story_fetch_max_concurrency)
+        return self.aio_session
+    
+    async def aio_close_session(self):
+        if self.aio_session and not self.aio_session.closed:
+            await self.aio_session.close()
+        self.aio_session = None
+        self.aio_semaphore = None
+
+    @asynccontextmanager
+    async def aio_session_scope(self):
+        '''Open session if needed, and only close the session opened by this scope.'''
+        owned = self.aio_session is None or self.aio_session.closed
+        await self.aio_open_session()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    return await response.json()
-        except Exception as e:
-            LOG.error(f"下载失败: {e}")
-            return {}
+            yield self.aio_session
+        finally:
+            if owned:
+                await self.aio_close_session()
+    
+    async def fetch_url(self, url, empty_data={}):
+        '''Request HN api with the pooled session, must be called in aio_session_scope (session is bound to its event loop).'''
+        if self.aio_session is None or self.aio_session.closed:
+            raise RuntimeError(f'HN session is not open, request in aio_session_scope: {url}')
+        return await self.fetcher.aio_get_json(self.aio_session, url, self.aio_semaphore, empty_data=empty_data)
+    
+    async def aio_fetch_top_story_ids(self):
+        if self.subscriber:
+            story_ids = self.subscriber.get_top_story_ids()
+            if story_ids:
+                return story_ids
+        return await self.fetch_url(self.api.top_stories_url(), empty_data=[])
+    
+    async def aio_fetch_updated_item_ids(self):
+        updates = await self.fetch_url(self.api.updates_url(), empty_data={})
+        if not isinstance(updates, dict):
+            return []
+        return updates.get('items', [])
+    
+    async def aio_sync_updated_items(self, date=GeeknewsDate.now()):
+        updated_ids = await self.aio_fetch_updated_item_ids()
+        sync_ids = await asyncio.to_thread(self.get_sync_ids, updated_ids, date)
+        downloaded_items = await self.aio_download_items(sync_ids)
+        return await self.aio_save_downloaded_items(downloaded_items, date)
+    
+    async def aio_fetch_daily_stories(self, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        '''
+        Same as fetch_daily_stories, but stories and comments are fetched concurrently.
+        aio methods run in the caller's aio_session_scope, they do not open sessions of their own.
+        '''
+        self.fetcher.stats.reset()
+        LOG.debug(f'开始请求top stories')
+        story_ids = await self.aio_fetch_top_story_ids()
+        story_ids = await self.aio_custom_rank_ids(story_ids, date=date, priority=True)
+        LOG.debug(f'已请求top stories id数量共{len(story_ids)}个, 限制下载{self.config.daily_story_max_count}个')
+        stories = await self.aio_fetch_top_stories(story_ids[:self.config.daily_story_max_count], date)
+        LOG.info(f'获取stories结束: {self.fetcher.stats.summary()}')
+        return self.save_daily_stories(stories, date, edition)
+    
+    async def aio_custom_rank_ids(self, story_ids, date=GeeknewsDate.now(), priority=True):
+        '''Same as custom_rank_ids, but runs in current event loop.'''
+        max_downloads = self.config.story_rank_max_count
+        if max_downloads == 0:
+            return story_ids
+        
+        story_ids = story_ids[:max_downloads]
+        if self.config.story_sync_mode == 'incremental':
+            await self.aio_sync_updated_items(date)
+        
+        stories = await self.aio_fetch_stories(story_ids, date)
+        return self.rank_story_ids(stories, date, priority)
     
     async def aio_fetch_stories(self, story_ids, date):
+        # read local items in bulk, download the missing ones and save them in one batch.
+        items, download_ids = await self.aio_get_cached_items(story_ids, date)
+
+        downloaded_items = await self.aio_download_items(download_ids)
+        items.update(await self.aio_save_downloaded_items(downloaded_items, date))
+        
+        return [items.get(id, {}) for id in story_ids]
+    
+    async def aio_download_items(self, ids):
         tasks = []
-        for id in story_ids:
-            task = asyncio.create_task(self.aio_fetch_story(id, date))
+        for id in ids:
+            task = asyncio.create_task(self.fetch_url(self.api.get_item_url(id)))
             tasks.append(task)
-        result = await asyncio.gather(*tasks)
-        return result
+        fetched_items = await asyncio.gather(*tasks)
+        return dict(zip(ids, fetched_items))
     
     async def aio_fetch_story(self, id, date):
-        story = await self.aio_get_local_item(id, date)
-        if not story:
+        items, download_ids = await self.aio_get_cached_items([id], date)
+        if download_ids:
             # LOG.debug(f"开始下载story_id: {id}")
             url = self.api.get_item_url(id)
             story = await self.fetch_url(url)
-            if story:
-                await self.aio_save_item(id, story, date)
-        return story
-
-    async def aio_get_local_item(self, id, date):
-        story_path = self.get_story_path(id, date)
-        if not os.path.exists(story_path):
-            return {}
-        # LOG.debug(f"本地读取已下载的story_id: {id}")
-        async with aiofiles.open(story_path) as f:
-            text = await f.read()
-            return json.loads(text)
-
-    async def aio_save_item(self, id, item, date):
-        story_path = self.get_story_path(id, date)
-        story_dir = os.path.dirname(story_path)
-        if not os.path.exists(story_dir):
-            os.makedirs(story_dir)
-        # LOG.debug(f"保存下载的story_id: {id}")
-        async with aiofiles.open(story_path, 'w') as f:
-            text = json.dumps(item, ensure_ascii=False)
-            await f.write(text)
+            items = await self.aio_save_downloaded_items({id: story}, date)
+        return items.get(id, {})
+
+    async def aio_fetch_top_stories(self, story_ids, date):
+        comment_limit = self.config.each_story_max_comment_count if self.config.summary_with_comments else 0
+        article_limit = self.config.daily_article_max_count
+
+        tasks = []
+        for index, id in enumerate(story_ids):
+            current_num = index + 1
+            mark_article = current_num <= article_limit
+            task = asyncio.create_task(self.aio_get_item(
+                id=id,
+                item_type='story',
+                parent_id=None,
+                recursive=mark_article if self.config.summary_with_comments else False,
+                remain_comment_count=comment_limit if mark_article else 0,
+                current_num=current_num,
+                mark_article=mark_article,
+                date=date,
+            ))
+            tasks.append(task)
+        return await asyncio.gather(*tasks)
+
+    async def aio_get_item(self, id, item_type='story', parent_id=None, recursive=False, remain_comment_count=10, current_num=0, mark_article=False, date=GeeknewsDate.now()):
+        '''Same as get_item, but comments of the same round are fetched concurrently.'''
+        item = await self.aio_fetch_story(id, date)
+        if not item:
+            item = {}
+
+        parent_log = f'源自{parent_id}, ' if parent_id else ''
+        article_log = f'精读文章' if mark_article else ''
+        LOG.debug(f'获取{item_type}: {id}, {parent_log}当前是第{current_num}个, {article_log}')
+
+        if mark_article:
+            item['article'] = True
+        if not recursive:
+            return item
+        if 'kids' not in item:
+            return item
+        
+        return await self.aio_get_comments(item, remain_comment_count, date)
+
+    async def aio_get_comments(self, item, remain_comment_count, date=GeeknewsDate.now()):
+        '''Same as get_comments, but comments of each round are fetched concurrently.'''
+        selector = HackernewsCommentSelector(item, remain_comment_count)
+        comment_ids = selector.next_ids()
+        while comment_ids:
+            comments = await self.aio_fetch_stories(comment_ids, date)
+            selector.add_items(dict(zip(comment_ids, comments)))
+            comment_ids = selector.next_ids()
+        return selector.build()
 
     def prefetch_stories(self, story_ids, date):
-        stories = []
-        for id in story_ids:
-            story = self.get_local_item(id, date)
-            if not story:
-                story = self.fetch_item(id)
-                self.save_item(id, story, date)
-            stories.append(story)
-        return stories
+        items, download_ids = self.get_cached_items(story_ids, date)
+        downloaded_items = {id: self.fetch_item(id) for id in download_ids}
+        items.update(self.save_downloaded_items(downloaded_items, date))
+        return [items.get(id, {}) for id in story_ids]
+    
+    def sync_updated_items(self, date=GeeknewsDate.now()):
+        '''
+        Incremental sync: read changed item ids from updates.json, only re-download
+        the changed items which are already in local date store or global item cache.
+        Unchanged items are reused until item cache ttl expires.
+        '''
+        updated_ids = self.fetch_updated_item_ids()
+        sync_ids = self.get_sync_ids(updated_ids, date)
+        downloaded_items = {id: self.fetch_item(id) for id in sync_ids}
+        return self.save_downloaded_items(downloaded_items, date)
+    
+    def get_sync_ids(self, updated_ids, date=GeeknewsDate.now()):
+        if not updated_ids:
+            return []
+        
+        local_ids = set(self.get_local_items(updated_ids, date).keys())
+        local_ids.update(self.item_store.get_cached_many(updated_ids).keys())
+        sync_ids = [id for id in updated_ids if id in local_ids]
+        LOG.debug(f'增量同步: 更新数量{len(updated_ids)}, 需要重新下载{len(sync_ids)}')
+        return sync_ids
     
     def custom_rank_ids(self, story_ids, date=GeeknewsDate.now(), priority=True):
         # get first batch ids and fetch details, filter in recent hours and sort by score
-        max_downloads = HN_MAX_DOWNLOADS
+        max_downloads = self.config.story_rank_max_count
 
         if max_downloads == 0:
             return story_ids
@@ -314,164 +482,82 @@ class HackernewsClient:
         stories = []
         story_ids = story_ids[:max_downloads]
 
-        if self.config.story_fetch_concurrent:
-            stories = asyncio.run(self.aio_fetch_stories(story_ids, date))
-        else:
-            stories = self.prefetch_stories(story_ids, date)
-        
+        if self.config.story_sync_mode == 'incremental':
+            self.sync_updated_items(date)
+
+        stories = self.prefetch_stories(story_ids, date)
+        return self.rank_story_ids(stories, date, priority)
+    
+    def rank_story_ids(self, stories, date=GeeknewsDate.now(), priority=True):
         # get sort_rule.json
         story_dir = self.datapath_manager.get_story_date_dir(date)
         rule_path = os.path.join(story_dir, 'sort_rule.json')
         rule_content = {}
         if priority and os.path.exists(rule_path):
             with open(rule_path) as f:
-                rule_content = json.load(f)
+                rule_content = codec.load(f)
 
-        if priority and rule_content:
-            stories = self.apply_sort_priority_rule(stories, rule_content)
-        stories = self.custom_rank_stories(stories, priority=priority)
-        if priority and rule_content:
-            stories = self.apply_sort_preorder_rule(stories, rule_content)
-        stories = self.sink_unsupport_stories(stories)
+        engine = self.create_ranking_engine(rule_content, priority)
+        stories = engine.rank(stories)
 
         return list(map(lambda x: x.get('id', 0), stories))
     
-    def custom_rank_stories(self, stories, priority=True):
-        stories = list(filter(self.should_keep_story, stories))
-        stories.sort(key=lambda x: x.get('score', 0), reverse=True)
-        if priority:
-            stories = self.up_high_priority_stories(stories)
-            stories = self.sink_low_priority_stories(stories)
-        return stories
-    
-    def should_keep_story(self, story: dict):
-        if not self.is_recent_story(story, HN_RECENT_HOURS):
-            return False
-        if self.is_job_hiring(story):
-            return False
-        return True
-    
-    def is_job_hiring(self, story: dict):
-        title = story.get('title', '')
-        if not title:
-            return False
-        
-        job_title = self.job_title_re.search(title)
-        return True if job_title else False
+    def create_ranking_engine(self, rule_content={}, priority=True):
+        '''
+        Rank order: preorder stories, others by score.
+        High priority stories behind article window are moved to the window boundary,
+        then low priority (not preordered) and uninterpretable stories are kept out of article window,
+        so the risen stories fill their places.
+        Sinks run as one pass until the window is full of eligible stories. The legacy ranking sank low priority
+        and uninterpretable stories in two single-shot passes, the second pass could move low priority stories
+        back into the window.
+        '''
+        engine = HackernewsRankingEngine(window_size=self.config.daily_article_max_count)
+        engine.register_filter(self.scorer.recent_rule(HN_RECENT_HOURS), batch=True)
+        engine.register_filter(ranking.job_hiring_rule)
+
+        preorder_ids = rule_content.get('preorder', []) if priority else []
+        priority_content = rule_content.get('priority', {}) if priority else {}
+        high_ids = priority_content.get('high', [])
+        low_ids = priority_content.get('low', [])
+
+        if preorder_ids:
+            engine.register_key(ranking.preorder_rule(preorder_ids))
+        if self.config.rank_mode == 'gravity':
+            engine.register_key(self.scorer.gravity_rule(), batch=True)
+        else:
+            engine.register_key(ranking.score_rule)
 
-    def is_recent_story(self, story: dict, in_hours: int):
-        timestamp = story.get('time', 0)
-        return self.is_recent(timestamp, in_hours)
+        if high_ids:
+            engine.register_rise(ranking.high_priority_rise_rule(high_ids))
+        if low_ids:
+            engine.register_sink(ranking.low_priority_sink_rule(low_ids, preorder_ids, high_ids))
+        engine.register_sink(ranking.uninterpretable_sink_rule)
 
+        return engine
+    
     @staticmethod
     def is_recent(timestamp: int, in_hours: int):
         date = datetime.fromtimestamp(timestamp)
         time_diff = datetime.now() - date
         return int(time_diff.total_seconds()) // (3600 * in_hours) == 0
     
-    def sink_unsupport_stories(self, stories: list):
-        '''move unsupport stories to the end of interpretable articles.'''
-        
-        end_index = self.config.daily_article_max_count
-        if end_index >= len(stories):
-            return stories
-        
-        stories = self.move_elements_down(
-            arr=stories, 
-            index=end_index, 
-            condition=self.uninterpretable_story
-        )
-        
-        return stories
-    
-    def uninterpretable_story(self, story):
-        '''不可解读的story'''
-        title = story.get('title', '').strip()
-        url = story.get('url', '').strip()
-
-        is_question = title.startswith('Ask HN:')
-        is_video = title.endswith('[video]')
-        is_pdf = url.endswith('.pdf') or url.startswith('https://arxiv.org/pdf/')
-
-        return is_question or is_pdf or is_video
-    
-    def sink_low_priority_stories(self, stories):
-        end_index = self.config.daily_article_max_count
-        if end_index >= len(stories):
-            return stories
-        
-        stories = self.move_elements_down(
-            arr=stories, 
-            index=end_index, 
-            condition=lambda s: s.get('priority', '') == 'low'
-        )
-        
-        return stories
-    
-    def up_high_priority_stories(self, stories):
-        end_index = self.config.daily_article_max_count
-        if end_index >= len(stories):
-            return stories
-        
-        stories = self.move_elements_up(
-            arr=stories, 
-            index=end_index, 
-            condition=lambda s: s.get('priority', '') == 'high'
-        )
-        
-        return stories
-    
-    @staticmethod
-    def move_elements_down(arr, index, condition):
-        '''find all elements in certain condition before a given index and move them after that index with ordering unchanged.'''
-        # Generated by deepseek-coder-v2:16b
-        if index >= len(arr) or index < 0:
-            return arr
-        
-        # Extract elements to be moved
-        elements_to_move = [arr[i] for i in range(len(arr)) if i < index and condition(arr[i])]
-        
-        # Remove these elements from the original array
-        arr = [arr[i] for i in range(len(arr)) if i >= index or not condition(arr[i])]
-        
-        # Insert the moved elements after the given index
-        arr[index:] = elements_to_move + arr[index:]
-        
-        return arr
-
-    @staticmethod
-    def move_elements_up(arr, index, condition):
-        if index < 0 or index >= len(arr):
-            return arr
-        # Extract elements to be moved
-        elements_to_move = [arr[i] for i in range(len(arr)) if i > index and condition(arr[i])]
-        # Remove these elements from the original array
-        arr = [arr[i] for i in range(len(arr)) if i <= index or not condition(arr[i])]
-        # Insert the moved elements before the given index
-        arr[:index] = arr[:index] + elements_to_move
-        return arr
-    
     def clean_local_items(self, date):
-        story_dir = self.datapath_manager.get_story_date_dir(date)
-        item_names = os.listdir(story_dir)
-        for filename in item_names:
-            name, ext = os.path.splitext(filename)
-            if name.isdigit() and ext == '.json':
-                item_path = os.path.join(story_dir, filename)
-                os.remove(item_path)
-    
-    def generate_preview(self, date=GeeknewsDate.now(), priority=True):
+        self.item_store.clean(date)
+    
+    def generate_preview(self, date=GeeknewsDate.now(), priority=True, edition: HackernewsDailyEdition = None):
         # fetch stories and rank them
+        self.fetcher.stats.reset()
         story_ids = self.fetch_top_story_ids()
         story_ids = self.custom_rank_ids(story_ids, date, priority)
+        LOG.info(f'获取预览stories结束: {self.fetcher.stats.summary()}')
         
         # get story list
+        local_items = self.get_local_items(story_ids, date)
         stories = []
         for index, id in enumerate(story_ids):
-            story_path = self.datapath_manager.get_story_file_path(id, date)
-            if os.path.exists(story_path):
-                with open(story_path) as f:
-                    story = json.load(f)
+            if id in local_items:
+                story = local_items[id]
                 
                 simple_story = {
                     "id": story["id"],
@@ -485,7 +571,10 @@ class HackernewsClient:
         story_dir = self.datapath_manager.get_story_date_dir(date)
         preview_path = os.path.join(story_dir, 'preview.json')
         with open(preview_path, 'w') as f:
-            json.dump(stories, f, ensure_ascii=False)
+            codec.dump(stories, f)
+        
+        if edition is not None:
+            edition.preview_stories = stories
         
         return preview_path
     
@@ -494,50 +583,6 @@ class HackernewsClient:
         preview_path = os.path.join(story_dir, 'preview.json')
         return preview_path
     
-    def apply_sort_preorder_rule(self, stories, rule_content):
-        if 'preorder' in rule_content:
-            preorder_ids = rule_content['preorder']
-            if not preorder_ids:
-                return stories
-            
-            story_mappings = {}
-            for story in stories:
-                id = story['id']
-                story_mappings[id] = story
-            
-            preorder_stories = []
-            collected_ids = set()
-            for id in preorder_ids:
-                if id in story_mappings:
-                    story = story_mappings[id]
-                    preorder_stories.append(story)
-                    collected_ids.add(id)
-            
-            for story in stories:
-                id = story['id']
-                if id not in collected_ids:
-                    preorder_stories.append(story)
-            
-            return preorder_stories
-        
-        return stories
-    
-    def apply_sort_priority_rule(self, stories, rule_content):
-        '''Read "sort_rule.json" then mark it to story list'''
-
-        if 'priority' in rule_content:
-            priority = rule_content['priority']
-            high_ids = set(priority.get('high', []))
-            low_ids = set(priority.get('low', []))
-            
-            for story in stories:
-                if story['id'] in high_ids:
-                    story['priority'] = 'high'
-                elif story['id'] in low_ids:
-                    story['priority'] = 'low'
-        
-        return stories
-    
     def make_priority_rule(self, rule_text, date):
         if ';' not in rule_text or ':' not in rule_text:
             return ""
@@ -594,7 +639,7 @@ class HackernewsClient:
         rule_content = {}
         if os.path.exists(rule_path):
             with open(rule_path) as f:
-                rule_content = json.load(f)
+                rule_content = codec.load(f)
 
         priority = rule_content.get('priority', {})
         if action_rule == 'append':
@@ -608,7 +653,7 @@ class HackernewsClient:
         rule_content['priority'] = priority
         
         with open(rule_path, 'w') as f:
-            json.dump(rule_content, f)
+            codec.dump(rule_content, f)
 
         return rule_path
     
@@ -619,7 +664,7 @@ class HackernewsClient:
         rule_content = {}
         if os.path.exists(rule_path):
             with open(rule_path) as f:
-                rule_content = json.load(f)
+                rule_content = codec.load(f)
 
         if isinstance(ids, list):
             rule_content['preorder'] = list(map(lambda x: int(x), ids))
@@ -627,7 +672,7 @@ class HackernewsClient:
             rule_content['preorder'] = list(map(lambda x: int(x), ids.split(',')))
         
         with open(rule_path, 'w') as f:
-            json.dump(rule_content, f)
+            codec.dump(rule_content, f)
 
         return rule_path
 
@@ -636,3 +681,67 @@ def test_hackernews_client():
     dpm = HackernewsDataPathManager(config)
     client = HackernewsClient(config=config, datapath_manager=dpm)
     client.fetch_daily_stories()
+
+
+def test_hackernews_client_sync_updated_items():
+    '''Incremental sync against a local stub of HN api: changed local items are downloaded again, others are skipped.'''
+    import time
+    import tempfile
+    import threading
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    now = int(time.time())
+    remote_items = {id: {'id': id, 'type': 'story', 'title': f'story {id}', 'score': 100, 'time': now} for id in (1, 2, 3)}
+    # 1: changed and stored locally, 2: stored locally but not changed, 3: changed but never fetched
+    updates = {'items': [1, 3], 'profiles': ['someone']}
+    requested_paths = []
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            requested_paths.append(self.path)
+            if self.path == '/v0/updates.json':
+                data = updates
+            else:
+                data = remote_items.get(int(self.path.split('/')[-1].split('.')[0]))
+            body = codec.dumps(data).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        for concurrent in (False, True):
+            config = HackernewsConfig.get_from_parser()
+            config.story_dir = tempfile.mkdtemp()
+            config.story_fetch_concurrent = concurrent
+            date = GeeknewsDate.now()
+            client = HackernewsClient(config, HackernewsDataPathManager(config))
+            client.api.base_url = f'http://127.0.0.1:{server.server_address[1]}/v0'
+            client.item_store.save_many({id: dict(remote_items[id], score=10) for id in (1, 2)}, date)
+            requested_paths.clear()
+
+            if concurrent:
+                async def aio_sync():
+                    async with client.aio_session_scope():
+                        return await client.aio_sync_updated_items(date)
+                synced_items = asyncio.run(aio_sync())
+            else:
+                synced_items = client.sync_updated_items(date)
+            assert sorted(requested_paths) == ['/v0/item/1.json', '/v0/updates.json'], requested_paths
+            assert list(synced_items.keys()) == [1]
+            assert client.get_local_item(1, date)['score'] == 100
+            assert client.get_local_item(2, date)['score'] == 10
+            assert not client.get_local_item(3, date)
+            LOG.info(f'增量同步测试通过, concurrent: {concurrent}')
+    finally:
+        server.shutdown()
+        server.server_close()
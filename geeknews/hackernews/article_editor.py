@@ -1,22 +1,28 @@
 import os
-import json
 import html
 import re
+import time
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 import aiofiles
-import curl_cffi
-from curl_cffi import AsyncSession
 
 from urllib.request import Request, urlopen
-from bs4 import BeautifulSoup
-from markdownify import MarkdownConverter
 
 from geeknews.llm import LLM
 from geeknews.utils.logger import LOG
 from geeknews.utils.date import GeeknewsDate
+from geeknews.utils import codec
+from geeknews.utils.truncation import TextTruncator, get_tokenizer
 from geeknews.hackernews.config import HackernewsConfig
 from geeknews.hackernews.data_path import HackernewsDataPathManager
 from geeknews.hackernews.api_client import HackernewsClient
+from geeknews.hackernews.daily_edition import HackernewsDailyEdition
+from geeknews.hackernews.item import HackernewsItem
+from geeknews.hackernews.crawler import HackernewsCrawler
+from geeknews.hackernews.page_cache import HackernewsPageCache
+from geeknews.hackernews.extractor import HackernewsExtractResult, extract_markdown
+from geeknews.hackernews.relevance import HackernewsRelevanceChecker
 
 """
 ### [A minimax chess engine in regular expressions](https://nicholas.carlini.com/writing/2025/regex-chess.html)
@@ -53,53 +59,21 @@ def count_words(text):
     return len(text.split())
 
 
-def reduce_text_by_words(text, word_limit, truncated=False, placeholder='...(content omitted)...'):
-    '''Reduce the text by limiting word count.'''
-    word_count = count_words(text)
-    extra_count = word_count - word_limit
-    if extra_count <= 0:
-        
-        # insert placeholder in the middle if needed
-        if truncated and placeholder:
-            if '\n' in text and not '\n' in placeholder:
-                placeholder = '\n\n' + placeholder + '\n\n'
-            half_length = len(text) // 2
-            return text[:half_length] + placeholder + text[half_length:]
-        
-        return text
-    
-    total_length = len(text)
-    word_length = total_length // word_count
-    extra_length = word_length * extra_count
-
-    start_index = (total_length - extra_length) // 2
-    end_index = start_index + extra_length
-    
-    # truncate text from middle section
-    start_part = text[:start_index]
-    end_part = text[end_index:]
-    trunc_text = start_part + '..' + end_part
-
-    return reduce_text_by_words(trunc_text, word_limit=word_limit, truncated=True, placeholder=placeholder)
-
-
+@dataclass(slots=True)
 class HackernewsSimpleStory:
-
-    def __init__(self, id, title, url, text=None, comments=[], score=0, article=False):
-        self.id = id
-        self.title = title
-        self.url = url
-        self.text = text
-        self.comments = comments
-        self.score = score
-        self.article = article  # should read link and comments 
+    id: int
+    title: str
+    url: str
+    text: str = None
+    comments: list = field(default_factory=list)
+    score: int = 0
+    article: bool = False   # should read link and comments 
 
 
+@dataclass(slots=True)
 class HackernewsSimpleComment:
-
-    def __init__(self, text, comments=[]):
-        self.text = text
-        self.comments = comments
+    text: str
+    comments: list = field(default_factory=list)
 
 
 class HackernewsArticleEditor:
@@ -110,24 +84,27 @@ class HackernewsArticleEditor:
         self.config = config
         self.datapath_manager = datapath_manager
         self.link_re = re.compile(r'<a href=.*?\/a>')
-        self.score_re = re.compile(r'-?\d+')
         self.job_title_re = re.compile(r'\(YC\s\w\d+\)\s\w+\s[Hh]iring')
-        self.md_converter = MarkdownConverter()
+        self.page_cache = HackernewsPageCache(config, datapath_manager.get_page_cache_path())
+        self.crawler = HackernewsCrawler(config, self.page_cache)
+        self.markdown_executor = None
+        self.truncator = self.create_truncator()
+        self.relevance_checker = HackernewsRelevanceChecker(llm, config)
     
     def parse_stories(self, stories):
         results = []
         for story in stories:
-            story_text = self.parse_text(story.get('text', ''))
-            story_comments = list(map(self.parse_comment, story.get('comments', []))) if self.config.summary_with_comments else []
-            story_id = story.get('id', 0)
+            item = HackernewsItem.from_dict(story)
+            story_text = self.parse_text(item.text)
+            story_comments = list(map(self.parse_comment, item.comments)) if self.config.summary_with_comments else []
             simple_story = HackernewsSimpleStory(
-                id=story_id,
-                title=story.get('title', ''),
-                url=story.get('url', HackernewsClient.get_default_story_url(story_id)),
+                id=item.id,
+                title=item.title,
+                url=item.url or HackernewsClient.get_default_story_url(item.id),
                 text=story_text,
                 comments=story_comments,
-                score=story.get('score', 0),
-                article=story.get('article', False),
+                score=item.score,
+                article=item.article,
             )
             results.append(simple_story)
         return results
@@ -152,56 +129,89 @@ class HackernewsArticleEditor:
 
         return text
     
-    def parse_comment(self, comment):
-        if not isinstance(comment, dict) or not comment:
-            return HackernewsSimpleComment('')
-        if 'text' not in comment:
+    def parse_comment(self, comment: HackernewsItem):
+        if not comment.text:
             return HackernewsSimpleComment('')
         
-        text = self.parse_text(comment['text'])
-        comments = []
-        if 'comments' in comment:
-            comments = list(map(self.parse_comment, comment['comments']))
+        text = self.parse_text(comment.text)
+        comments = list(map(self.parse_comment, comment.comments))
         
         return HackernewsSimpleComment(text, comments)
     
-    def generate_topstories_articles(self, date=GeeknewsDate.now()):
-        self.generate_articles_for_category('topstories', date)
+    def generate_topstories_articles(self, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        self.generate_articles_for_category('topstories', date, edition)
+    
+    def generate_articles_for_category(self, category, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        stories = self.load_category_stories(category, date, edition)
+        if stories is not None:
+            self.generate_articles(stories, date, edition)
     
-    def generate_articles_for_category(self, category, date=GeeknewsDate.now()):
+    def load_category_stories(self, category, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        if edition is not None and category == 'topstories':
+            return edition.stories
+        
         story_list_path = self.datapath_manager.get_stories_file_path(name=category, date=date)
         if not os.path.exists(story_list_path):
             LOG.debug(f'{category}路径不存在: {story_list_path}')
-            return
+            return None
         
         with open(story_list_path) as f:
-            stories = json.load(f)
+            return codec.load(f)
         
-        if self.config.story_fetch_concurrent:
-            asyncio.run(self.aio_generate_articles(stories, date))
-        else:
-            self.generate_articles(stories, date)
-        
-    def generate_articles(self, stories, date=GeeknewsDate.now()):
-        simple_stories = self.parse_stories(stories)
+    def generate_articles(self, stories, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        simple_stories = self.crawler.scheduler.interleave(self.parse_stories(stories), lambda story: story.url)
         LOG.debug(f'开始编辑')
 
         for story in simple_stories:
-            article_path = self.datapath_manager.get_article_file_path(story.id, date)
-            if os.path.exists(article_path):
-                continue
             if not story.article:
                 continue
+            article_path = self.datapath_manager.get_article_file_path(story.id, date)
+            if os.path.exists(article_path) or self.reuse_indexed_article(story, article_path):
+                self.load_article(story.id, article_path, edition)
+                continue
             article = self.generate_article(story)
             if not article:
                 LOG.debug(f'拒绝整理{story.id}, 没有内容')
+                if edition is not None:
+                    edition.rejected_ids.add(story.id)
                 continue
             LOG.debug(f'完成全文编辑: {story.id}')
             with open(article_path, 'w') as f:
                 f.write(article)
+            self.index_article(story, article, article_path)
+            if edition is not None:
+                edition.articles[story.id] = article
 
         LOG.debug(f'编辑结束: {self.datapath_manager.get_article_date_dir(date)}')
     
+    def reuse_indexed_article(self, story, article_path):
+        '''Copy article of same story and source from previous day, return True if reused.'''
+        content_index = self.datapath_manager.get_content_index()
+        if not content_index.enabled:
+            return False
+        source_hash = content_index.get_source_hash(story)
+        indexed_path = content_index.find_article(story.id, source_hash, article_path)
+        if indexed_path is None:
+            return False
+        article = content_index.copy_file(indexed_path, article_path)
+        if not article:
+            return False
+        content_index.add_article(story.id, source_hash, article, article_path)
+        LOG.info(f'复用文章: {story.id} <- {indexed_path}')
+        return True
+
+    def index_article(self, story, article, article_path):
+        content_index = self.datapath_manager.get_content_index()
+        if content_index.enabled:
+            content_index.add_article(story.id, content_index.get_source_hash(story), article, article_path)
+
+    def load_article(self, story_id, article_path, edition: HackernewsDailyEdition = None):
+        '''Load article generated by previous run into daily edition.'''
+        if edition is None or story_id in edition.articles:
+            return
+        with open(article_path) as f:
+            edition.articles[story_id] = f.read()
+    
     def generate_article(self, story):
         if not self.support_story(story):
             return ''
@@ -228,12 +238,13 @@ class HackernewsArticleEditor:
     def construct_article_components(self, story, text):
         title = self.generate_article_title(story.title)
         comment = self.generate_article_comment(story.comments) if self.config.summary_with_comments else ''
-        final_text = reduce_text_by_words(text, word_limit=self.config.max_word_count)
+        result = self.truncator.truncate(text, self.get_max_input_tokens())
+        final_text = result.text
         
-        if len(final_text) < len(text):
-            LOG.info(f"{story.id} 文章词汇量有裁剪: 从{count_words(text)}减到{count_words(final_text)}")
+        if result.truncated:
+            LOG.info(f"{story.id} 文章{self.truncator.tokenizer.name}数有裁剪: 从{result.tokens_in}减到{result.tokens_out}")
         else:
-            LOG.info(f"{story.id} 文章词汇量: {count_words(final_text)}")
+            LOG.info(f"{story.id} 文章{self.truncator.tokenizer.name}数: {result.tokens_out}")
         
         lines = []
         lines.append(title)
@@ -245,6 +256,16 @@ class HackernewsArticleEditor:
         
         return '\n'.join(lines)
     
+    def create_truncator(self):
+        '''Truncate article text by tokens of summary model, or by words if max_input_tokens is 0.'''
+        by_words = self.config.max_input_tokens <= 0
+        return TextTruncator(get_tokenizer(self.config.summary_model, by_words=by_words))
+
+    def get_max_input_tokens(self):
+        if self.config.max_input_tokens > 0:
+            return self.config.max_input_tokens
+        return self.config.max_word_count
+
     def truncate_text_by_length(self, text, text_total_limit, text_head_limit):
         text_length = len(text)
         if text_length > text_total_limit:
@@ -257,25 +278,7 @@ class HackernewsArticleEditor:
     
     def check_article_relevance_score(self, title, content):
         '''Check title and content relevance and return a score of 0-100.'''
-        formatted_text = f"<title>{title}</title>\n<content>\n{content}\n</content>"
-        result = self.llm.get_gemini_text(
-            system_prompt=LLM.get_system_prompt('check_article_relevance', subdir='hackernews'),
-            user_content=formatted_text,
-        )
-        if not result:
-            return 0
-        
-        score_match = self.score_re.search(result)
-        if not score_match:
-            return 0
-        
-        score_text = score_match.group()
-        try:
-            score = int(score_text)
-            return score
-        except Exception as e:
-            LOG.error(f"文章内容相关性评分解析失败: {e}")
-            return 0
+        return self.relevance_checker.check_score(title, content)
 
     def generate_article_title(self, title):
         return f"# {title}"
@@ -316,12 +319,25 @@ class HackernewsArticleEditor:
         LOG.debug(f'正在读取链接: {url}')
         try:
             text = self.get_text_from_url_by_curl_impersonate(url)
-            soup = BeautifulSoup(text, 'html.parser')
-            return self.md_converter.convert_soup(soup)
+            return self.convert_page_to_markdown(url, text)
         except Exception as e:
             LOG.error(str(e))
             return ''
     
+    def convert_page_to_markdown(self, url, text):
+        '''Extract content of page as markdown, markdown of unchanged page is read from page cache.'''
+        backend = self.config.extract_backend
+        markdown = self.page_cache.get_markdown(url, text, backend)
+        if markdown is not None:
+            return markdown
+        result = extract_markdown(text, backend)
+        self.save_extract_result(url, text, result)
+        return result.markdown
+
+    def save_extract_result(self, url, text, result: HackernewsExtractResult):
+        LOG.info(f'提取正文: {url}, {result.summary()}')
+        self.page_cache.set_markdown(url, text, result.markdown, result.backend)
+
     def get_text_from_url_by_urllib(self, url):
         # https://www.useragentstring.com/pages/Chrome/
         headers = {
@@ -339,11 +355,7 @@ class HackernewsArticleEditor:
         
     def get_text_from_url_by_curl_impersonate(self, url):
         # https://github.com/lexiforest/curl_cffi
-        response = curl_cffi.get(url, impersonate="chrome")
-        if response.status_code == 200:
-            return response.text
-        else:
-            return ''
+        return self.crawler.get_text(url)
     
     def support_story(self, story: HackernewsSimpleStory):
         # if has text and not job hiring, then ok
@@ -378,60 +390,102 @@ class HackernewsArticleEditor:
             return ''
         
         with open(story_path) as f:
-            story = json.load(f)
+            story = codec.load(f)
+        
+        return self.download_article_content_by_story(story)
+    
+    def download_article_content_by_story_id(self, story_id, date=GeeknewsDate.now()):
+        '''For debugging!'''
+        story = self.datapath_manager.get_item_store().get(story_id, date)
+        if not story:
+            return ''
         
+        return self.download_article_content_by_story(story)
+    
+    def download_article_content_by_story(self, story):
         stories = self.parse_stories([story])
         return self.generate_article(stories[0])
     
     # =======
     # asyncio
     # =======
+    
+    async def aio_generate_topstories_articles(self, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        await self.aio_generate_articles_for_category('topstories', date, edition)
+    
+    async def aio_generate_articles_for_category(self, category, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        stories = self.load_category_stories(category, date, edition)
+        if stories is not None:
+            await self.aio_generate_articles(stories, date, edition)
         
-    async def aio_generate_articles(self, stories, date=GeeknewsDate.now()):
-        simple_stories = self.parse_stories(stories)
+    async def aio_generate_articles(self, stories, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        simple_stories = self.crawler.scheduler.interleave(self.parse_stories(stories), lambda story: story.url)
         LOG.debug(f'开始编辑')
 
         tasks = []
         for story in simple_stories:
+            if not story.article:
+                continue
             article_path = self.datapath_manager.get_article_file_path(story.id, date)
-            if not story.article or os.path.exists(article_path):
+            if os.path.exists(article_path) or self.reuse_indexed_article(story, article_path):
+                self.load_article(story.id, article_path, edition)
                 continue
-            task = asyncio.create_task(self.aio_generate_article_and_save(story, article_path))
+            task = self.aio_generate_article_and_save(story, article_path, edition)
             tasks.append(task)
         
-        await asyncio.gather(*tasks)
+        try:
+            # crawl session and llm clients are from the caller's scopes
+            await asyncio.gather(*tasks)
+        finally:
+            # worker processes are not kept between runs of daemon
+            await asyncio.to_thread(self.close_markdown_executor)
         LOG.debug(f'编辑结束: {self.datapath_manager.get_article_date_dir(date)}')
 
-    async def aio_generate_article_and_save(self, story, article_path):
+    async def aio_generate_article_and_save(self, story, article_path, edition: HackernewsDailyEdition = None):
         article = await self.aio_generate_article(story)
+        await self.aio_save_article(story, article, article_path, edition)
+    
+    async def aio_save_article(self, story, article, article_path, edition: HackernewsDailyEdition = None):
+        '''Save article, or mark story as rejected if article is empty.'''
         if article:
             async with aiofiles.open(article_path, 'w') as f:
                 await f.write(article)
+            self.index_article(story, article, article_path)
+            if edition is not None:
+                edition.articles[story.id] = article
         else:
             LOG.debug(f'拒绝整理{story.id}, 没有内容')
+            if edition is not None:
+                edition.rejected_ids.add(story.id)
     
     async def aio_generate_article(self, story):
         if not self.support_story(story):
             return ''
 
         text = await self.aio_generate_article_text(story)
-        if not text:
+        if not await self.aio_validate_article_text(story, text):
             return ''
         
+        return self.construct_article_components(story, text)
+    
+    async def aio_validate_article_text(self, story, text):
+        if not text:
+            return False
+        
         # check relevance of title and web content, maybe is empty web page.
         if text and not story.text:
             word_count = count_words(text)
             if word_count == 0:
-                return ''
+                return False
             if word_count < self.config.validate_word_count and self.llm:
-                relevance_score = await self.aio_check_article_relevance_score(story.title, text)
+                relevance_score = await self.aio_check_article_relevance_score(story.id, story.title, text)
                 if relevance_score > self.config.validation_score:
                     LOG.info(f"{story.id} 文章内容相关性评分: {relevance_score}")
                 else:
                     LOG.error(f"{story.id} 文章内容不相关: {relevance_score}")
-                    return ''
+                    return False
         
-        return self.construct_article_components(story, text)
+        return True
     
     async def aio_generate_article_text(self, story: HackernewsSimpleStory) -> str:
         text = await self.aio_get_markdown_text_from_url(story.url)
@@ -446,42 +500,46 @@ class HackernewsArticleEditor:
         LOG.debug(f'正在读取链接: {url}')
         try:
             text = await self.aio_get_text_from_url_by_curl_impersonate(url)
-            soup = BeautifulSoup(text, 'html.parser')
-            return self.md_converter.convert_soup(soup)
+            return await self.aio_convert_page_to_markdown(url, text)
         except Exception as e:
             LOG.error(str(e))
             return ''
         
+    async def aio_convert_page_to_markdown(self, url, text):
+        '''Same as convert_page_to_markdown, but extraction runs in process pool, so event loop is not blocked.'''
+        backend = self.config.extract_backend
+        markdown = self.page_cache.get_markdown(url, text, backend)
+        if markdown is not None:
+            return markdown
+        executor = self.get_markdown_executor()
+        if executor is None:
+            result = extract_markdown(text, backend)
+        else:
+            result = await asyncio.get_running_loop().run_in_executor(executor, extract_markdown, text, backend)
+        self.save_extract_result(url, text, result)
+        return result.markdown
+
+    def get_markdown_executor(self):
+        '''Process pool of content extraction (html to markdown), None if markdown_workers is 0.'''
+        if self.config.markdown_workers <= 0:
+            return None
+        if self.markdown_executor is None:
+            self.markdown_executor = ProcessPoolExecutor(max_workers=self.config.markdown_workers)
+        return self.markdown_executor
+
+    def close_markdown_executor(self):
+        '''Shut down worker processes at the end of each article generation run.'''
+        if self.markdown_executor is not None:
+            self.markdown_executor.shutdown()
+            self.markdown_executor = None
+
     async def aio_get_text_from_url_by_curl_impersonate(self, url):
         # https://github.com/lexiforest/curl_cffi
-        async with AsyncSession() as session:
-            response = await session.get(url, impersonate="chrome")
-            if response.status_code == 200:
-                return response.text
-            else:
-                return ''
+        return await self.crawler.aio_get_text(url)
 
-    async def aio_check_article_relevance_score(self, title, content):
-        '''Check title and content relevance and return a score of 0-100.'''
-        formatted_text = f"<title>{title}</title>\n<content>\n{content}\n</content>"
-        result = await self.llm.aio_get_gemini_text(
-            system_prompt=LLM.get_system_prompt('check_article_relevance', subdir='hackernews'),
-            user_content=formatted_text,
-        )
-        if not result:
-            return 0
-        
-        score_match = self.score_re.search(result)
-        if not score_match:
-            return 0
-        
-        score_text = score_match.group()
-        try:
-            score = int(score_text)
-            return score
-        except Exception as e:
-            LOG.error(f"文章内容相关性评分解析失败: {e}")
-            return 0
+    async def aio_check_article_relevance_score(self, story_id, title, content):
+        '''Check title and content relevance and return a score of 0-100, concurrent checks are batched.'''
+        return await self.relevance_checker.aio_check_score(story_id, title, content)
 
 
 def test_hackernews_article_editor():
@@ -489,4 +547,59 @@ def test_hackernews_article_editor():
     dpm = HackernewsDataPathManager(config)    
     editor = HackernewsArticleEditor(None, config, dpm)
     editor.generate_topstories_articles()
-    
\ No newline at end of file
+    
+
+
+def benchmark_markdown_stall(page_count=50, interval=0.01):
+    '''
+    Measure event loop stall while converting pages to markdown, in event loop vs in process pool.
+    Pages are read from page cache (saved pages), or generated if cache is empty.
+    '''
+    config = HackernewsConfig.get_from_parser()
+    dpm = HackernewsDataPathManager(config)
+    editor = HackernewsArticleEditor(None, config, dpm)
+
+    pages = []
+    if os.path.exists(dpm.get_page_cache_path()):
+        rows = editor.page_cache.connection.execute('SELECT body FROM pages LIMIT ?', (page_count,))
+        pages = [body for body, in rows]
+    if not pages:
+        paragraph = '<p>Lorem <a href="https://example.com">ipsum</a> dolor <b>sit</b> amet, consectetur adipiscing elit.</p>'
+        pages = [f'<html><body><h1>Page {i}</h1>' + paragraph * (200 + i * 40) + '</body></html>' for i in range(page_count)]
+    total_mb = sum(len(page) for page in pages) / 1024 / 1024
+
+    async def measure(convert):
+        stalls = []
+        done = asyncio.Event()
+
+        async def ticker():
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(interval)
+                stalls.append(max(time.perf_counter() - start - interval, 0))
+
+        ticker_task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        await asyncio.gather(*[convert(page, i * interval) for i, page in enumerate(pages)])
+        elapsed = time.perf_counter() - start
+        done.set()
+        await ticker_task
+        return elapsed, max(stalls, default=0), sum(stalls)
+
+    # pages arrive one by one like crawl results
+    async def convert_in_loop(page, delay):
+        await asyncio.sleep(delay)
+        extract_markdown(page, config.extract_backend)
+
+    async def convert_in_pool(page, delay):
+        await asyncio.sleep(delay)
+        await asyncio.get_running_loop().run_in_executor(executor, extract_markdown, page, config.extract_backend)
+
+    workers = max(config.markdown_workers, 1)
+    LOG.info(f'benchmark: {len(pages)} pages, {total_mb:.2f} MB, {workers} workers')
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # start worker processes before measuring
+        list(executor.map(extract_markdown, ['<p></p>'] * workers))
+        for name, convert in [('event loop', convert_in_loop), ('process pool', convert_in_pool)]:
+            elapsed, max_stall, total_stall = asyncio.run(measure(convert))
+            LOG.info(f'{name}: {elapsed:.2f}s, max stall {max_stall*1000:.1f} ms, total stall {total_stall*1000:.1f} ms')
@@ -0,0 +1,158 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from geeknews.llm import LLM
+from geeknews.llm_cache import LLMCache
+from geeknews.utils import codec
+from geeknews.utils.logger import LOG
+from geeknews.utils.date import GeeknewsDate
+from geeknews.hackernews.config import HackernewsConfig
+from geeknews.hackernews.data_path import HackernewsDataPathManager
+from geeknews.hackernews.manager import HackernewsManager
+
+
+class HackernewsBackfill:
+    '''
+    Rebuild reports of a date range, each date runs in a process of the pool.
+    - llm requests of all processes are limited by one shared semaphore.
+    - llm responses are cached in a shared sqlite file, articles on disk are reused (crawl cache).
+    - finished dates are recorded in a state file, so a broken backfill resumes where it left off.
+    - dates whose worker process failed (e.g. broken pool) are recorded with status error, and retried on resume.
+    '''
+
+    def __init__(self, config: HackernewsConfig, datapath_manager: HackernewsDataPathManager):
+        self.config = config
+        self.datapath_manager = datapath_manager
+
+    def get_state_path(self, start_date: GeeknewsDate, end_date: GeeknewsDate, locale='zh_cn'):
+        backfill_dir = self.datapath_manager.get_backfill_dir()
+        return os.path.join(backfill_dir, f'{locale}_{start_date.formatted}_{end_date.formatted}.json')
+
+    def load_state(self, state_path):
+        if not os.path.exists(state_path):
+            return {'dates': {}}
+        with open(state_path) as f:
+            return codec.load(f)
+
+    def save_state(self, state, state_path):
+        # write to temp file first, state file is never half written
+        temp_path = state_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            codec.dump(state, f, indent=True)
+        os.replace(temp_path, state_path)
+
+    def run(self, start_date: GeeknewsDate, end_date: GeeknewsDate, locale='zh_cn'):
+        '''Return results of all dates in range, sorted by date.'''
+        dates = start_date.get_dates_until(end_date)
+        state_path = self.get_state_path(start_date, end_date, locale)
+        state = self.load_state(state_path)
+        results = state['dates']
+        start_time = time.perf_counter()
+
+        pending_dates = [d for d in dates if results.get(d.formatted, {}).get('status') != 'done']
+        LOG.info(f'[回填]{start_date.formatted}..{end_date.formatted}, 共{len(dates)}天, 待处理{len(pending_dates)}天')
+
+        if pending_dates and not self.check_llm():
+            for date in pending_dates:
+                results[date.formatted] = self.get_error_result(date.formatted, 'llm客户端不可用')
+            self.save_state(state, state_path)
+        elif pending_dates:
+            config_values = {name: getattr(self.config, name) for name in HackernewsConfig.__annotations__}
+            llm_semaphore = multiprocessing.Semaphore(max(self.config.backfill_llm_concurrency, 1))
+            workers = min(max(self.config.backfill_workers, 1), len(pending_dates))
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_backfill_worker, initargs=(config_values, llm_semaphore)) as executor:
+                futures = {}
+                for date in pending_dates:
+                    try:
+                        futures[executor.submit(run_backfill_date, date.formatted, locale)] = date.formatted
+                    except BrokenProcessPool as e:
+                        results[date.formatted] = self.get_error_result(date.formatted, e)
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # e.g. BrokenProcessPool: initializer failed or a worker was killed
+                        result = self.get_error_result(futures[future], e)
+                    results[result['date']] = result
+                    self.save_state(state, state_path)
+                    LOG.info(f"[回填]{result['date']} {result['status']}, 用时{result['seconds']:.1f}秒")
+                self.save_state(state, state_path)
+
+        LOG.info(f'[回填]结束, 总用时{time.perf_counter() - start_time:.1f}秒, 进度: {state_path}')
+        return [results[d.formatted] for d in dates if d.formatted in results]
+
+    def check_llm(self):
+        '''Workers create llm clients in initializer, check credentials here as a failed initializer only breaks the pool.'''
+        try:
+            LLM()
+        except Exception as e:
+            LOG.error(f'[回填]无法创建llm客户端, 请检查API key: {e}')
+            return False
+        return True
+
+    @staticmethod
+    def get_error_result(date_text, error):
+        LOG.error(f'[回填]{date_text} 进程出错: {error}')
+        return {'date': date_text, 'status': 'error', 'seconds': 0, 'articles': 0, 'summaries': 0, 'error': str(error)}
+
+    @staticmethod
+    def format_results(results):
+        lines = ['date        status   seconds  articles  summaries']
+        total_seconds = 0
+        for result in results:
+            total_seconds += result['seconds']
+            line = f"{result['date']}  {result['status']:<7} {result['seconds']:>8.1f} {result['articles']:>9} {result['summaries']:>10}"
+            if result.get('error'):
+                line += f"  {result['error']}"
+            lines.append(line)
+        failed_count = sum(1 for result in results if result['status'] in ('error', 'failed'))
+        lines.append(f'total: {len(results)} days, {failed_count} failed, {total_seconds:.1f} seconds of all days')
+        return '\n'.join(lines)
+
+
+# ==================
+# worker process
+# ==================
+
+backfill_worker_manager: HackernewsManager = None
+
+
+def init_backfill_worker(config_values, llm_semaphore):
+    global backfill_worker_manager
+
+    # HackernewsConfig keeps values in class attributes, restore them in new process
+    for name, value in config_values.items():
+        setattr(HackernewsConfig, name, value)
+    config = HackernewsConfig()
+    dpm = HackernewsDataPathManager(config)
+
+    llm = LLM()
+    llm.semaphore = llm_semaphore
+    llm.cache = LLMCache(dpm.get_llm_cache_path())
+    backfill_worker_manager = HackernewsManager(llm, config, dpm)
+
+
+def run_backfill_date(date_text, locale='zh_cn'):
+    date = GeeknewsDate.parse(date_text)
+    start_time = time.perf_counter()
+    result = {'date': date_text, 'status': 'failed', 'seconds': 0, 'articles': 0, 'summaries': 0}
+
+    try:
+        edition = backfill_worker_manager.rebuild_daily_report(locale, date)
+    except Exception as e:
+        LOG.error(f'[回填]{date_text} 出错: {e}')
+        edition = None
+
+    if edition is not None:
+        result['status'] = 'done'
+        result['articles'] = len(edition.articles)
+        result['summaries'] = len(edition.get_summaries(locale))
+    elif not os.path.exists(backfill_worker_manager.datapath_manager.get_stories_file_path('topstories', date)):
+        result['status'] = 'skipped'
+
+    result['seconds'] = time.perf_counter() - start_time
+    return result
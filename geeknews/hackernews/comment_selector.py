@@ -0,0 +1,131 @@
+import math
+from dataclasses import dataclass, field
+from geeknews.utils.logger import LOG
+
+
+# rank of a fetched comment: more replies and longer text rank higher, later position ranks lower
+REPLY_WEIGHT = 1.0
+TEXT_WEIGHT = 0.5
+POSITION_WEIGHT = 0.5
+
+
+@dataclass(slots=True)
+class HackernewsCommentCandidate:
+    id: int
+    parent_id: int
+    position: int
+    score: float
+
+
+@dataclass(slots=True)
+class HackernewsCommentNode:
+    item: dict
+    parent_id: int
+    position: int
+    weight: float
+    children: list = field(default_factory=list)
+
+
+class HackernewsCommentSelector:
+    '''
+    Select comments of a story breadth first within a budget (count of comments).
+    - comments are fetched level by level, top level comments first, so one deep thread can not use up the budget.
+    - candidates of a level are ranked before fetching: HN position of comment and weight of its parent (replies, text length, position).
+    - each round fetches only as many candidates as the remaining budget, deleted / dead / empty comments are replaced in next round.
+    - fetching stops once the budget is met.
+
+    Usage: fetch items of next_ids() and pass them to add_items() until next_ids() is empty, then build().
+    '''
+
+    def __init__(self, story: dict, budget: int):
+        self.story = story
+        self.budget = max(budget, 0)
+        self.nodes = {}
+        self.level = 0
+        self.level_ids = []
+        self.pending = {}
+        self.fetch_count = 0
+        self.candidates = self.get_candidates(story.get('id'), story.get('kids', []), 0)
+
+    @staticmethod
+    def get_weight(item, position):
+        reply_count = len(item.get('kids', []))
+        text_length = len(item.get('text', '') or '')
+        return REPLY_WEIGHT * math.log1p(reply_count) + TEXT_WEIGHT * math.log1p(text_length) - POSITION_WEIGHT * position
+
+    @staticmethod
+    def is_valid(item):
+        return bool(item) and not item.get('deleted') and not item.get('dead') and bool(item.get('text'))
+
+    def get_candidates(self, parent_id, kids, parent_weight):
+        return [HackernewsCommentCandidate(id, parent_id, position, parent_weight - position) for position, id in enumerate(kids)]
+
+    @property
+    def remain_count(self):
+        return self.budget - len(self.nodes)
+
+    def next_ids(self):
+        '''Ids to fetch in next round, empty if budget is met or no comments left.'''
+        if self.remain_count <= 0:
+            return []
+        if not self.candidates:
+            self.next_level()
+        if not self.candidates:
+            return []
+
+        # stable sort keeps HN order for equal scores
+        self.candidates.sort(key=lambda c: c.score, reverse=True)
+        batch = self.candidates[:self.remain_count]
+        self.candidates = self.candidates[self.remain_count:]
+        self.pending = {c.id: c for c in batch}
+        self.fetch_count += len(batch)
+        return [c.id for c in batch]
+
+    def next_level(self):
+        candidates = []
+        for id in self.level_ids:
+            node = self.nodes[id]
+            candidates.extend(self.get_candidates(id, node.item.get('kids', []), node.weight))
+        if candidates:
+            self.level += 1
+            self.level_ids = []
+        self.candidates = candidates
+
+    def add_items(self, items: dict):
+        '''Add fetched items {id: item} of ids from next_ids().'''
+        for id, candidate in self.pending.items():
+            item = items.get(id)
+            if not self.is_valid(item) or self.remain_count <= 0:
+                continue
+            self.nodes[id] = HackernewsCommentNode(item, candidate.parent_id, candidate.position, self.get_weight(item, candidate.position))
+            self.level_ids.append(id)
+        self.pending = {}
+
+    def build(self):
+        '''Return story with selected comments nested in HN order.'''
+        top_nodes = []
+        for node in self.nodes.values():
+            parent = self.nodes.get(node.parent_id)
+            if parent is None:
+                top_nodes.append(node)
+            else:
+                parent.children.append(node)
+
+        story_id = self.story.get('id')
+        LOG.debug(f'{story_id} 评论: 请求{self.fetch_count}条, 选中{len(self.nodes)}条, 共{self.level + 1}层')
+        self.story.pop('kids', None)
+        comments = self.build_comments(top_nodes)
+        if comments:
+            self.story['comments'] = comments
+        return self.story
+
+    def build_comments(self, nodes):
+        comments = []
+        for node in sorted(nodes, key=lambda n: n.position):
+            item = node.item
+            item.pop('kids', None)
+            children = self.build_comments(node.children)
+            if children:
+                item['comments'] = children
+            comments.append(item)
+        return comments
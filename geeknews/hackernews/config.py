@@ -8,18 +8,67 @@ class HackernewsConfig:
     article_dir: str
     summary_dir: str
     report_dir: str
+    item_store: str
+    item_cache_ttl_minutes: int
+    story_sync_mode: str
+    live_subscribe: bool
+    live_subscribe_mode: str
+    live_poll_min_seconds: int
+    live_poll_max_seconds: int
 
     daily_story_max_count: int
     daily_article_max_count: int
     each_story_max_comment_count: int
     story_fetch_concurrent: bool
+    story_rank_max_count: int
+    rank_mode: str
+    rank_gravity: float
+    rank_comment_weight: float
+    story_fetch_max_per_host: int
+    story_fetch_max_concurrency: int
+    story_fetch_connect_timeout: int
+    story_fetch_read_timeout: int
+    story_fetch_max_retries: int
+    story_fetch_backoff_seconds: float
+    circuit_failure_threshold: int
+    circuit_reset_seconds: int
+
+    crawl_max_concurrency: int
+    crawl_max_per_host: int
+    crawl_connect_timeout: int
+    crawl_total_timeout: int
+    crawl_max_bytes: int
+    crawl_cache: bool
+    crawl_cache_max_mb: int
+    crawl_cache_max_days: int
+    markdown_workers: int
+    extract_backend: str
+    crawl_domain_rate: float
+    crawl_domain_burst: int
+    crawl_max_retries: int
+    crawl_retry_after_max_seconds: int
 
     summary_model: str
     summary_with_comments: bool
 
+    pipeline_mode: str
+    pipeline_fetch_workers: int
+    pipeline_crawl_workers: int
+    pipeline_relevance_workers: int
+    pipeline_summary_workers: int
+
+    backfill_workers: int
+    backfill_llm_concurrency: int
+    content_index: bool
+
     max_word_count: int
+    max_input_tokens: int
     validate_word_count: int
     validation_score: int
+    relevance_batch_size: int
+    relevance_batch_wait_ms: int
+    relevance_prefilter: bool
+    relevance_accept_overlap: float
 
     update_freq_days: int
     update_exec_time: str
@@ -32,18 +81,67 @@ class HackernewsConfig:
         cls.article_dir = configparser.get_abs_path(cls.section, 'article_dir')
         cls.summary_dir = configparser.get_abs_path(cls.section, 'summary_dir')
         cls.report_dir = configparser.get_abs_path(cls.section, 'report_dir')
+        cls.item_store = configparser.get(cls.section, 'item_store')
+        cls.item_cache_ttl_minutes = configparser.get_integer(cls.section, 'item_cache_ttl_minutes')
+        cls.story_sync_mode = configparser.get(cls.section, 'story_sync_mode')
+        cls.live_subscribe = configparser.get_bool(cls.section, 'live_subscribe')
+        cls.live_subscribe_mode = configparser.get(cls.section, 'live_subscribe_mode')
+        cls.live_poll_min_seconds = configparser.get_integer(cls.section, 'live_poll_min_seconds')
+        cls.live_poll_max_seconds = configparser.get_integer(cls.section, 'live_poll_max_seconds')
 
         cls.daily_story_max_count = configparser.get_integer(cls.section, 'daily_story_max_count')
         cls.daily_article_max_count = configparser.get_integer(cls.section, 'daily_article_max_count')
         cls.each_story_max_comment_count = configparser.get_integer(cls.section, 'each_story_max_comment_count')
         cls.story_fetch_concurrent = configparser.get_bool(cls.section, 'story_fetch_concurrent')
+        cls.story_rank_max_count = configparser.get_integer(cls.section, 'story_rank_max_count')
+        cls.rank_mode = configparser.get(cls.section, 'rank_mode')
+        cls.rank_gravity = configparser.get_float(cls.section, 'rank_gravity')
+        cls.rank_comment_weight = configparser.get_float(cls.section, 'rank_comment_weight')
+        cls.story_fetch_max_per_host = configparser.get_integer(cls.section, 'story_fetch_max_per_host')
+        cls.story_fetch_max_concurrency = configparser.get_integer(cls.section, 'story_fetch_max_concurrency')
+        cls.story_fetch_connect_timeout = configparser.get_integer(cls.section, 'story_fetch_connect_timeout')
+        cls.story_fetch_read_timeout = configparser.get_integer(cls.section, 'story_fetch_read_timeout')
+        cls.story_fetch_max_retries = configparser.get_integer(cls.section, 'story_fetch_max_retries')
+        cls.story_fetch_backoff_seconds = configparser.get_float(cls.section, 'story_fetch_backoff_seconds')
+        cls.circuit_failure_threshold = configparser.get_integer(cls.section, 'circuit_failure_threshold')
+        cls.circuit_reset_seconds = configparser.get_integer(cls.section, 'circuit_reset_seconds')
+
+        cls.crawl_max_concurrency = configparser.get_integer(cls.section, 'crawl_max_concurrency')
+        cls.crawl_max_per_host = configparser.get_integer(cls.section, 'crawl_max_per_host')
+        cls.crawl_connect_timeout = configparser.get_integer(cls.section, 'crawl_connect_timeout')
+        cls.crawl_total_timeout = configparser.get_integer(cls.section, 'crawl_total_timeout')
+        cls.crawl_max_bytes = configparser.get_integer(cls.section, 'crawl_max_bytes')
+        cls.crawl_cache = configparser.get_bool(cls.section, 'crawl_cache')
+        cls.crawl_cache_max_mb = configparser.get_integer(cls.section, 'crawl_cache_max_mb')
+        cls.crawl_cache_max_days = configparser.get_integer(cls.section, 'crawl_cache_max_days')
+        cls.markdown_workers = configparser.get_integer(cls.section, 'markdown_workers')
+        cls.extract_backend = configparser.get(cls.section, 'extract_backend')
+        cls.crawl_domain_rate = configparser.get_float(cls.section, 'crawl_domain_rate')
+        cls.crawl_domain_burst = configparser.get_integer(cls.section, 'crawl_domain_burst')
+        cls.crawl_max_retries = configparser.get_integer(cls.section, 'crawl_max_retries')
+        cls.crawl_retry_after_max_seconds = configparser.get_integer(cls.section, 'crawl_retry_after_max_seconds')
 
         cls.summary_model = configparser.get(cls.section, 'summary_model')
         cls.summary_with_comments = configparser.get_bool(cls.section, 'summary_with_comments')
 
+        cls.pipeline_mode = configparser.get(cls.section, 'pipeline_mode')
+        cls.pipeline_fetch_workers = configparser.get_integer(cls.section, 'pipeline_fetch_workers')
+        cls.pipeline_crawl_workers = configparser.get_integer(cls.section, 'pipeline_crawl_workers')
+        cls.pipeline_relevance_workers = configparser.get_integer(cls.section, 'pipeline_relevance_workers')
+        cls.pipeline_summary_workers = configparser.get_integer(cls.section, 'pipeline_summary_workers')
+
+        cls.backfill_workers = configparser.get_integer(cls.section, 'backfill_workers')
+        cls.backfill_llm_concurrency = configparser.get_integer(cls.section, 'backfill_llm_concurrency')
+        cls.content_index = configparser.get_bool(cls.section, 'content_index')
+
         cls.max_word_count = configparser.get_integer(cls.section, 'max_word_count')
+        cls.max_input_tokens = configparser.get_integer(cls.section, 'max_input_tokens')
         cls.validate_word_count = configparser.get_integer(cls.section, 'validate_word_count')
         cls.validation_score = configparser.get_integer(cls.section, 'validation_score')
+        cls.relevance_batch_size = configparser.get_integer(cls.section, 'relevance_batch_size')
+        cls.relevance_batch_wait_ms = configparser.get_integer(cls.section, 'relevance_batch_wait_ms')
+        cls.relevance_prefilter = configparser.get_bool(cls.section, 'relevance_prefilter')
+        cls.relevance_accept_overlap = configparser.get_float(cls.section, 'relevance_accept_overlap')
 
         cls.update_freq_days = configparser.get_integer(cls.section, 'update_freq_days')
         cls.update_exec_time = configparser.get(cls.section, 'update_exec_time')
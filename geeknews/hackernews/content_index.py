@@ -0,0 +1,128 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from geeknews.utils.logger import LOG
+from geeknews.hackernews.config import HackernewsConfig
+
+
+class HackernewsContentIndex:
+    '''
+    Global content-addressed index of generated articles and summaries across dates, to reuse them for repeat stories.
+    - article: keyed by story id and source hash (url, story text, comment texts), reused without crawling.
+    - summary: keyed by hash of (article content, system prompt, model), reused without calling llm.
+    Files are copied into the new date dir (not hard linked, files may be overwritten in place later).
+    '''
+
+    def __init__(self, config: HackernewsConfig, db_path):
+        self.config = config
+        self.db_path = db_path
+        self.local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.config.content_index
+
+    @property
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+
+        db_dir = os.path.dirname(self.db_path)
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS articles (story_id INTEGER NOT NULL, source_hash TEXT NOT NULL, content_hash TEXT NOT NULL, path TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (story_id, path))')
+        conn.execute('CREATE TABLE IF NOT EXISTS summaries (summary_key TEXT NOT NULL, locale TEXT NOT NULL, path TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (summary_key, locale, path))')
+        conn.commit()
+
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def get_hash(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get_source_hash(self, story):
+        '''Hash of the inputs of an article, which are known before crawling.'''
+        comment_texts = []
+        if self.config.summary_with_comments:
+            comment_texts = self.get_comment_texts(story.comments)
+        return self.get_hash(story.url, story.text or '', *comment_texts)
+
+    def get_comment_texts(self, comments):
+        texts = []
+        for comment in comments:
+            texts.append(comment.text)
+            texts.extend(self.get_comment_texts(comment.comments))
+        return texts
+
+    def find_article(self, story_id, source_hash, exclude_path):
+        '''Return path of the latest article of story with same source, which is not exclude_path.'''
+        if not self.enabled:
+            return None
+        rows = self.connection.execute(
+            'SELECT path FROM articles WHERE story_id = ? AND source_hash = ? AND path != ? ORDER BY updated_at DESC',
+            (int(story_id), source_hash, exclude_path),
+        )
+        for path, in rows:
+            if os.path.exists(path):
+                return path
+        return None
+
+    def add_article(self, story_id, source_hash, article, path):
+        if not self.enabled:
+            return
+        with self.connection as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO articles (story_id, source_hash, content_hash, path, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (int(story_id), source_hash, self.get_hash(article), path, time.time()),
+            )
+
+    def find_summary(self, summary_key, locale, exclude_path):
+        if not self.enabled:
+            return None
+        rows = self.connection.execute(
+            'SELECT path FROM summaries WHERE summary_key = ? AND locale = ? AND path != ? ORDER BY updated_at DESC',
+            (summary_key, locale, exclude_path),
+        )
+        for path, in rows:
+            if os.path.exists(path):
+                return path
+        return None
+
+    def add_summary(self, summary_key, locale, path):
+        if not self.enabled:
+            return
+        with self.connection as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO summaries (summary_key, locale, path, updated_at) VALUES (?, ?, ?, ?)',
+                (summary_key, locale, path, time.time()),
+            )
+
+    def copy_file(self, source_path, target_path):
+        '''Copy indexed file to target path, return content or None if failed.'''
+        try:
+            shutil.copyfile(source_path, target_path)
+            with open(target_path) as f:
+                return f.read()
+        except OSError as e:
+            LOG.error(f'复用文件失败: {source_path}, {e}')
+            return None
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
@@ -0,0 +1,136 @@
+import time
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from geeknews.utils.logger import LOG
+from geeknews.hackernews.config import HackernewsConfig
+
+
+class HackernewsTokenBucket:
+    '''
+    Token bucket of one domain: refill `rate` tokens per second up to `capacity` (burst).
+    The bucket is blocked (no tokens) until a time, when the domain asks to retry later.
+    '''
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0
+
+    def take(self, now):
+        '''Take one token and return 0, or return seconds to wait before next try.'''
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        # unlimited rate, only Retry-After of server blocks the domain
+        if self.rate <= 0:
+            return 0
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def block(self, now, seconds):
+        # one request is allowed right after the blocked time, then refill at rate
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 1
+        self.updated_at = self.blocked_until
+
+
+class HackernewsCrawlScheduler:
+    '''
+    Politeness of crawling: requests are grouped by host name, each host has its own token bucket.
+    Hosts are not merged into registered domains, sites of multi tenant domains (*.github.io, *.blogspot.com) are unrelated.
+    - a request waits for token of its domain before taking a connection, so other domains keep going meanwhile.
+    - 429/503 responses block the domain for Retry-After seconds.
+    - interleave() orders urls round robin by domain, so a sequential crawl does not wait on one domain.
+    '''
+
+    def __init__(self, config: HackernewsConfig):
+        self.config = config
+        self.buckets = {}
+
+    @staticmethod
+    def get_domain(url):
+        '''Host name of url without www, e.g. https://www.example.com/x -> example.com, https://a.github.io/x -> a.github.io'''
+        host = (urlsplit(url).hostname or '').lower()
+        if host.startswith('www.'):
+            return host[4:]
+        return host
+
+    def get_bucket(self, domain):
+        bucket = self.buckets.get(domain)
+        if bucket is None:
+            bucket = HackernewsTokenBucket(self.config.crawl_domain_rate, self.config.crawl_domain_burst)
+            self.buckets[domain] = bucket
+        return bucket
+
+    def wait(self, url):
+        bucket = self.get_bucket(self.get_domain(url))
+        while True:
+            seconds = bucket.take(time.monotonic())
+            if seconds <= 0:
+                return
+            time.sleep(seconds)
+
+    async def aio_wait(self, url):
+        bucket = self.get_bucket(self.get_domain(url))
+        while True:
+            seconds = bucket.take(time.monotonic())
+            if seconds <= 0:
+                return
+            await asyncio.sleep(seconds)
+
+    def get_retry_after(self, value, attempt=0):
+        '''Seconds of Retry-After header (seconds or http date), exponential backoff if missing.'''
+        seconds = None
+        if value:
+            value = value.strip()
+            if value.isdigit():
+                seconds = int(value)
+            else:
+                try:
+                    retry_date = parsedate_to_datetime(value)
+                    seconds = (retry_date - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    seconds = None
+        if seconds is None:
+            seconds = 2 ** attempt
+        return max(seconds, 0)
+
+    def should_retry(self, url, status_code, retry_after, attempt=0):
+        '''Block the domain if server asks to slow down, return True if request should be retried.'''
+        if status_code not in (429, 503):
+            return False
+
+        domain = self.get_domain(url)
+        seconds = self.get_retry_after(retry_after, attempt)
+        max_seconds = self.config.crawl_retry_after_max_seconds
+        self.get_bucket(domain).block(time.monotonic(), min(seconds, max_seconds))
+
+        if attempt >= self.config.crawl_max_retries or seconds > max_seconds:
+            LOG.error(f'{domain} 请求过多(状态码{status_code}), 放弃: {url}')
+            return False
+        LOG.info(f'{domain} 请求过多(状态码{status_code}), {seconds:.0f}秒后重试: {url}')
+        return True
+
+    def interleave(self, items, get_url):
+        '''Order items round robin by domain of url, keep order of items in each domain.'''
+        groups = {}
+        for item in items:
+            groups.setdefault(self.get_domain(get_url(item) or ''), []).append(item)
+
+        results = []
+        queues = list(groups.values())
+        index = 0
+        while len(results) < len(items):
+            for queue in queues:
+                if index < len(queue):
+                    results.append(queue[index])
+            index += 1
+        return results
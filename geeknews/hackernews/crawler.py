@@ -0,0 +1,215 @@
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+from curl_cffi import Session, AsyncSession
+from geeknews.utils.logger import LOG
+from geeknews.hackernews.config import HackernewsConfig
+from geeknews.hackernews.crawl_scheduler import HackernewsCrawlScheduler
+from geeknews.hackernews.page_cache import HackernewsPageCache
+
+
+# content types which can be converted to markdown, empty content type is tried as html
+TEXT_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain', 'text/markdown')
+
+
+class HackernewsCrawler:
+    '''
+    Read web pages of stories with a reusable curl_cffi session (keep-alive, browser impersonation).
+    - aio requests share one AsyncSession in current event loop, see aio_session_scope.
+    - concurrent requests are limited globally and per host.
+    - connect timeout and total timeout of each request are from config.
+    - requests of same domain are rate limited by scheduler, 429/503 are retried after Retry-After.
+    - body is streamed: non html content is skipped, download stops at crawl_max_bytes (partial html is kept).
+    - pages are cached on disk if page_cache is given, cached pages are revalidated with conditional request.
+    '''
+
+    def __init__(self, config: HackernewsConfig, page_cache: HackernewsPageCache = None):
+        self.config = config
+        self.page_cache = page_cache
+        self.impersonate = 'chrome'
+        self.scheduler = HackernewsCrawlScheduler(config)
+        self.session = None
+        self.aio_session = None
+        self.aio_semaphore = None
+        self.aio_host_semaphores = {}
+        self.aio_scope_count = 0
+
+    @property
+    def timeout(self):
+        '''(connect, read) for curl_cffi, total time of request is connect + read.'''
+        connect_timeout = self.config.crawl_connect_timeout
+        return (connect_timeout, max(self.config.crawl_total_timeout - connect_timeout, 1))
+
+    @staticmethod
+    def get_host(url):
+        return urlsplit(url).netloc.lower()
+
+    def is_text_response(self, url, response):
+        '''Check headers before reading body.'''
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type and content_type not in TEXT_CONTENT_TYPES:
+            LOG.error(f'不支持的内容类型{content_type}: {url}')
+            return False
+
+        content_length = response.headers.get('Content-Length', '')
+        if content_length.isdigit() and int(content_length) > self.config.crawl_max_bytes:
+            LOG.info(f'内容长度{content_length}超过{self.config.crawl_max_bytes}字节, 只读取部分内容: {url}')
+        return True
+
+    def decode_body(self, response, chunks):
+        body = b''.join(chunks)[:self.config.crawl_max_bytes]
+        try:
+            return body.decode(response.encoding, errors='replace')
+        except LookupError:
+            return body.decode('utf-8', errors='replace')
+
+    def read_text(self, url, response):
+        if not self.is_text_response(url, response):
+            return ''
+        chunks, size = [], 0
+        for chunk in response.iter_content():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.config.crawl_max_bytes:
+                LOG.debug(f'读取{size}字节后停止: {url}')
+                break
+        return self.decode_body(response, chunks)
+
+    def get_cached_page(self, url):
+        '''Return cached page (or None) and headers to revalidate it.'''
+        if self.page_cache is None:
+            return None, {}
+        cached_page = self.page_cache.get(url)
+        return cached_page, self.page_cache.get_conditional_headers(cached_page)
+
+    def get_not_modified_text(self, url, response, cached_page):
+        '''Return cached body if server says page is not modified, or None.'''
+        if response.status_code != 304 or cached_page is None:
+            return None
+        LOG.debug(f'网页未修改, 使用缓存: {url}')
+        self.page_cache.touch(url)
+        return cached_page.body
+
+    def save_page(self, url, response, text):
+        if self.page_cache is not None and text:
+            headers = {k.lower(): v for k, v in response.headers.items()}
+            self.page_cache.set(url, text, headers)
+
+    def get_text(self, url):
+        '''Return page text, or empty text if failed.'''
+        if self.session is None:
+            self.session = Session(impersonate=self.impersonate, timeout=self.timeout)
+        cached_page, headers = self.get_cached_page(url)
+        attempt = 0
+        while True:
+            self.scheduler.wait(url)
+            response = self.session.get(url, headers=headers, stream=True)
+            try:
+                text = self.get_not_modified_text(url, response, cached_page)
+                if text is not None:
+                    return text
+                if response.status_code == 200:
+                    text = self.read_text(url, response)
+                    self.save_page(url, response, text)
+                    return text
+            finally:
+                # stop the transfer if body is not read to the end
+                response.close()
+            if not self.scheduler.should_retry(url, response.status_code, response.headers.get('Retry-After'), attempt):
+                break
+            attempt += 1
+        LOG.error(f'读取链接失败: {url}, 状态码{response.status_code}')
+        return ''
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    # =======
+    # aio
+    # =======
+
+    async def aio_open_session(self):
+        '''Create the pooled session shared by all crawl requests in current event loop.'''
+        if self.aio_session is not None:
+            return self.aio_session
+
+        max_concurrency = max(self.config.crawl_max_concurrency, 1)
+        self.aio_session = AsyncSession(max_clients=max_concurrency, impersonate=self.impersonate, timeout=self.timeout)
+        self.aio_semaphore = asyncio.Semaphore(max_concurrency)
+        self.aio_host_semaphores = {}
+        return self.aio_session
+
+    async def aio_close_session(self):
+        if self.aio_session is not None:
+            await self.aio_session.close()
+        self.aio_session = None
+        self.aio_semaphore = None
+        self.aio_host_semaphores = {}
+
+    @asynccontextmanager
+    async def aio_session_scope(self):
+        '''Open session if needed, the session is closed when the last scope exits (scopes may overlap in tasks).'''
+        await self.aio_open_session()
+        self.aio_scope_count += 1
+        try:
+            yield self.aio_session
+        finally:
+            self.aio_scope_count -= 1
+            if self.aio_scope_count == 0:
+                await self.aio_close_session()
+
+    def get_host_semaphore(self, host):
+        semaphore = self.aio_host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(self.config.crawl_max_per_host, 1))
+            self.aio_host_semaphores[host] = semaphore
+        return semaphore
+
+    async def aio_get_text(self, url):
+        '''Return page text, or empty text if failed.'''
+        cached_page, headers = self.get_cached_page(url)
+        async with self.aio_session_scope() as session:
+            attempt = 0
+            while True:
+                # wait for domain token before taking a connection, other domains are not blocked meanwhile
+                await self.scheduler.aio_wait(url)
+                async with self.get_host_semaphore(self.get_host(url)), self.aio_semaphore:
+                    response = await session.get(url, headers=headers, stream=True)
+                    try:
+                        text = self.get_not_modified_text(url, response, cached_page)
+                        if text is not None:
+                            return text
+                        if response.status_code == 200:
+                            text = await self.aio_read_text(url, response)
+                            self.save_page(url, response, text)
+                            return text
+                    finally:
+                        await self.aio_close_response(response)
+                if not self.scheduler.should_retry(url, response.status_code, response.headers.get('Retry-After'), attempt):
+                    break
+                attempt += 1
+        LOG.error(f'读取链接失败: {url}, 状态码{response.status_code}')
+        return ''
+
+    async def aio_read_text(self, url, response):
+        if not self.is_text_response(url, response):
+            return ''
+        chunks, size = [], 0
+        async for chunk in response.aiter_content():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.config.crawl_max_bytes:
+                LOG.debug(f'读取{size}字节后停止: {url}')
+                break
+        return self.decode_body(response, chunks)
+
+    async def aio_close_response(self, response):
+        '''Stop the transfer if body is not read to the end (aclose alone waits for the whole body).'''
+        if response.quit_now is not None:
+            response.quit_now.set()
+        try:
+            await response.aclose()
+        except Exception as e:
+            LOG.debug(f'关闭连接: {e}')
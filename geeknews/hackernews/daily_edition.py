@@ -0,0 +1,75 @@
+import os
+from geeknews.utils.logger import LOG
+from geeknews.utils.date import GeeknewsDate
+from geeknews.utils import codec
+from geeknews.hackernews.data_path import HackernewsDataPathManager
+
+
+class HackernewsDailyEdition:
+    '''
+    In-memory data of one day, built (or loaded from disk) once per run and passed through every stage:
+    fetch -> articles -> summaries -> reports. Disk is only used for persistence.
+    '''
+
+    def __init__(self, date=GeeknewsDate.now()):
+        self.date = date
+        self.stories = []           # ranked story items, top n are marked with 'article'
+        self.short_stories = []     # stories which are not articles, for story list
+        self.preview_stories = []   # ranked simple stories for preview
+        self.articles = {}          # story id -> article markdown
+        self.rejected_ids = set()   # story ids which can not be generated to article
+        self.summaries = {}         # locale -> {story id -> summary markdown}
+        self.story_list_summaries = {}  # locale -> {story list name -> summary markdown}
+
+    def get_story(self, story_id):
+        story_id = int(story_id)
+        for story in self.stories:
+            if story.get('id', 0) == story_id:
+                return story
+        return {}
+
+    @property
+    def article_stories(self):
+        return [s for s in self.stories if s.get('article', False)]
+
+    def get_summaries(self, locale):
+        return self.summaries.setdefault(locale, {})
+
+    def get_story_list_summaries(self, locale):
+        return self.story_list_summaries.setdefault(locale, {})
+
+    @classmethod
+    def load(cls, datapath_manager: HackernewsDataPathManager, locale='zh_cn', date=GeeknewsDate.now()):
+        '''Load persisted data of date from disk.'''
+        edition = cls(date)
+
+        stories_path = datapath_manager.get_stories_file_path(name='topstories', date=date)
+        if os.path.exists(stories_path):
+            with open(stories_path) as f:
+                edition.stories = codec.load(f)
+
+        short_stories_path = datapath_manager.get_stories_file_path(name='short_stories', date=date)
+        if os.path.exists(short_stories_path):
+            with open(short_stories_path) as f:
+                edition.short_stories = codec.load(f)
+
+        for story in edition.article_stories:
+            story_id = story.get('id', 0)
+            article_path = datapath_manager.get_article_file_path(story_id, date)
+            if os.path.exists(article_path):
+                with open(article_path) as f:
+                    edition.articles[story_id] = f.read()
+
+            summary_path = datapath_manager.get_summary_file_path(story_id, locale, date)
+            if os.path.exists(summary_path):
+                with open(summary_path) as f:
+                    edition.get_summaries(locale)[story_id] = f.read()
+
+        summary_dir = datapath_manager.get_summary_full_dir(locale, date)
+        short_summary_path = os.path.join(summary_dir, 'short_stories.md')
+        if os.path.exists(short_summary_path):
+            with open(short_summary_path) as f:
+                edition.get_story_list_summaries(locale)['short_stories'] = f.read()
+
+        LOG.debug(f'读取每日数据: {date}, 文章{len(edition.articles)}篇, 总结{len(edition.get_summaries(locale))}篇')
+        return edition
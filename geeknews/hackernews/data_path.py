@@ -1,6 +1,8 @@
 import os
 from geeknews.utils.date import GeeknewsDate
 from geeknews.hackernews.config import HackernewsConfig
+from geeknews.hackernews.item_store import HackernewsItemStore, create_item_store
+from geeknews.hackernews.content_index import HackernewsContentIndex
 
 
 def auto_make_dirs(func):
@@ -17,6 +19,24 @@ class HackernewsDataPathManager:
     def __init__(self, config: HackernewsConfig):
         self.config = config
         self.enable_debug_date = False
+        self.item_store = None
+        self.content_index = None
+
+    def get_item_store(self) -> HackernewsItemStore:
+        if self.item_store is None:
+            self.item_store = create_item_store(self.config, self)
+        return self.item_store
+    
+    def get_item_store_path(self):
+        return os.path.join(self.config.story_dir, 'items.sqlite3')
+
+    def get_content_index(self) -> HackernewsContentIndex:
+        if self.content_index is None:
+            self.content_index = HackernewsContentIndex(self.config, self.get_content_index_path())
+        return self.content_index
+
+    def get_content_index_path(self):
+        return os.path.join(self.config.story_dir, 'content_index.sqlite3')
     
     @auto_make_dirs
     def get_story_date_dir(self, date=GeeknewsDate.now()):
@@ -29,6 +49,20 @@ class HackernewsDataPathManager:
         story_date_dir = self.get_story_date_dir(date)
         return os.path.join(story_date_dir, f'{id}.json')
         
+    @auto_make_dirs
+    def get_item_cache_dir(self):
+        return os.path.join(self.config.story_dir, 'cache')
+    
+    def get_page_cache_path(self):
+        return os.path.join(self.config.story_dir, 'page_cache.sqlite3')
+    
+    def get_llm_cache_path(self):
+        return os.path.join(self.config.story_dir, 'llm_cache.sqlite3')
+    
+    @auto_make_dirs
+    def get_backfill_dir(self):
+        return os.path.join(self.config.story_dir, 'backfill')
+        
     def get_stories_file_path(self, name='topstories', date=GeeknewsDate.now()):
         story_date_dir = self._get_dir_with_date(self.config.story_dir, date)
         return os.path.join(story_date_dir, f'{name}.json')
@@ -0,0 +1,165 @@
+import re
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from bs4 import BeautifulSoup
+from markdownify import MarkdownConverter
+from geeknews.utils.logger import LOG
+
+# https://lxml.de/lxml.html
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+
+# elements which are never article content
+NON_CONTENT_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object', 'embed', 'button', 'input', 'select', 'textarea', 'dialog']
+# elements which are boilerplate inside the main node
+BOILERPLATE_TAGS = ['nav', 'aside', 'form', 'footer']
+BOILERPLATE_RE = re.compile(r'cookie|consent|gdpr|banner|newsletter|subscribe|signup|share|social|sidebar|related|recommend|promo|advert|sponsor|popup|modal|breadcrumb|comment-form|skip-link', re.I)
+MAIN_NODE_XPATHS = ['//article', '//main', '//*[@role="main"]', '//*[@itemprop="articleBody"]']
+MIN_MAIN_TEXT_LENGTH = 200
+
+
+@dataclass(slots=True)
+class HackernewsExtractResult:
+    markdown: str
+    backend: str
+    bytes_in: int = 0
+    words_out: int = 0
+    parse_seconds: float = 0
+
+    def summary(self):
+        return f'{self.bytes_in}字节 -> {self.words_out}词, 用时{self.parse_seconds*1000:.1f}毫秒 ({self.backend})'
+
+
+class HackernewsContentExtractor(ABC):
+    '''Extract article content of html page and convert it to markdown.'''
+
+    name = ''
+
+    def __init__(self):
+        self.md_converter = MarkdownConverter()
+
+    @abstractmethod
+    def extract(self, text) -> str:
+        pass
+
+
+class HackernewsSoupExtractor(HackernewsContentExtractor):
+    '''Convert the whole page by BeautifulSoup html.parser.'''
+
+    name = 'soup'
+
+    def extract(self, text):
+        soup = BeautifulSoup(text, 'html.parser')
+        return self.md_converter.convert_soup(soup)
+
+
+class HackernewsLxmlExtractor(HackernewsContentExtractor):
+    '''
+    Parse page by lxml, strip non-content elements and convert only the main article node.
+    Main node is article / main element, or the block with most text (not link text) if not found.
+    '''
+
+    name = 'lxml'
+
+    def extract(self, text):
+        try:
+            doc = lxml.html.document_fromstring(text)
+        except ValueError:
+            # unicode string with xml encoding declaration
+            doc = lxml.html.document_fromstring(text.encode('utf-8'))
+        except etree.ParserError:
+            return ''
+
+        self.remove_elements(doc, NON_CONTENT_TAGS)
+        etree.strip_elements(doc, etree.Comment, with_tail=False)
+
+        node = self.find_main_node(doc)
+        self.remove_elements(node, BOILERPLATE_TAGS)
+        self.remove_boilerplate(node)
+
+        html = lxml.html.tostring(node, encoding='unicode')
+        soup = BeautifulSoup(html, 'lxml')
+        return self.md_converter.convert_soup(soup)
+
+    def remove_elements(self, node, tags):
+        for element in list(node.iter(*tags)):
+            if element is not node and element.getparent() is not None:
+                element.drop_tree()
+
+    def remove_boilerplate(self, node):
+        candidates = [e for e in node.iter() if isinstance(e.tag, str) and e is not node and self.is_boilerplate(e)]
+        for element in candidates:
+            if element.getparent() is not None:
+                element.drop_tree()
+
+    def is_boilerplate(self, element):
+        if element.tag in ('html', 'body', 'main', 'article'):
+            return False
+        attributes = f"{element.get('id', '')} {element.get('class', '')}"
+        return BOILERPLATE_RE.search(attributes) is not None
+
+    def find_main_node(self, doc):
+        for xpath in MAIN_NODE_XPATHS:
+            nodes = doc.xpath(xpath)
+            if nodes:
+                node = max(nodes, key=self.get_text_length)
+                if self.get_text_length(node) >= MIN_MAIN_TEXT_LENGTH:
+                    return node
+
+        # block with most text which is not link text
+        body = doc.body if doc.find('body') is not None else doc
+        best_node, best_score = body, 0
+        for node in body.iter('div', 'section', 'td'):
+            score = self.get_text_length(node) - 2 * self.get_link_text_length(node)
+            if score > best_score:
+                best_node, best_score = node, score
+        if self.get_text_length(best_node) < MIN_MAIN_TEXT_LENGTH:
+            return body
+        return best_node
+
+    @staticmethod
+    def get_text_length(node):
+        return len(' '.join(node.text_content().split()))
+
+    @staticmethod
+    def get_link_text_length(node):
+        return sum(len(a.text_content().strip()) for a in node.iter('a'))
+
+
+EXTRACTOR_CLASSES = {
+    HackernewsSoupExtractor.name: HackernewsSoupExtractor,
+    HackernewsLxmlExtractor.name: HackernewsLxmlExtractor,
+}
+extractors = {}
+
+
+def get_content_extractor(backend) -> HackernewsContentExtractor:
+    '''Extractor of backend (created once in each process), soup if backend is unknown or not installed.'''
+    if backend == HackernewsLxmlExtractor.name and lxml is None:
+        LOG.error('未安装lxml, 使用soup提取网页内容')
+        backend = HackernewsSoupExtractor.name
+    if backend not in EXTRACTOR_CLASSES:
+        LOG.error(f'未知的extract_backend: {backend}, 使用soup')
+        backend = HackernewsSoupExtractor.name
+    if backend not in extractors:
+        extractors[backend] = EXTRACTOR_CLASSES[backend]()
+    return extractors[backend]
+
+
+def extract_markdown(text, backend='lxml') -> HackernewsExtractResult:
+    '''Extract markdown of html page, it is cpu heavy and may run in worker process.'''
+    extractor = get_content_extractor(backend)
+    start = time.perf_counter()
+    markdown = extractor.extract(text) if text else ''
+    return HackernewsExtractResult(
+        markdown=markdown,
+        backend=extractor.name,
+        bytes_in=len(text.encode('utf-8', errors='replace')) if text else 0,
+        words_out=len(markdown.split()),
+        parse_seconds=time.perf_counter() - start,
+    )
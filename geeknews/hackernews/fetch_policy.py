@@ -0,0 +1,177 @@
+import time
+import random
+import asyncio
+import threading
+import requests
+import aiohttp
+from geeknews.utils.logger import LOG
+from geeknews.hackernews.config import HackernewsConfig
+
+
+class HackernewsFetchStats:
+    '''Counters of one run.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def add(self, name, count=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    def summary(self):
+        return f'请求{self.requests}次, 重试{self.retries}次, 失败{self.failures}次, 熔断跳过{self.rejected}次'
+
+
+class HackernewsCircuitBreaker:
+    '''
+    Stop requesting a host after continuous failures, then allow one trial request after reset time.
+    closed -> (failures >= threshold) -> open -> (reset time passed) -> half-open -> closed/open
+    '''
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failure_count = 0
+        self.opened_at = 0
+        self.trial_running = False
+
+    @property
+    def is_open(self):
+        return self.failure_count >= self.failure_threshold
+
+    def allow(self):
+        with self.lock:
+            if not self.is_open:
+                return True
+            # half-open: only one trial request
+            if time.time() - self.opened_at >= self.reset_seconds and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failure_count = 0
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failure_count += 1
+            self.trial_running = False
+            if self.is_open:
+                if self.failure_count == self.failure_threshold:
+                    LOG.error(f'HN接口连续失败{self.failure_count}次, 暂停请求{self.reset_seconds}秒')
+                self.opened_at = time.time()
+
+
+class HackernewsRetryableError(Exception):
+    pass
+
+
+class HackernewsFetcher:
+    '''Shared fetch layer of HN api for both sync and aio paths: timeouts, jittered exponential retries and circuit breaker.'''
+
+    def __init__(self, config: HackernewsConfig):
+        self.config = config
+        self.stats = HackernewsFetchStats()
+        self.breaker = HackernewsCircuitBreaker(
+            failure_threshold=config.circuit_failure_threshold,
+            reset_seconds=config.circuit_reset_seconds,
+        )
+        self.local = threading.local()
+
+    @property
+    def session(self):
+        # requests.Session is not thread-safe, keep one per thread
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self.local.session = session
+        return session
+
+    @property
+    def timeout(self):
+        return (self.config.story_fetch_connect_timeout, self.config.story_fetch_read_timeout)
+
+    def get_backoff_delay(self, attempt):
+        # full jitter: random between 0 and exponential cap
+        cap = min(self.config.story_fetch_backoff_seconds * (2 ** attempt), 30)
+        return random.uniform(0, cap)
+
+    @staticmethod
+    def is_retryable_status(status):
+        return status == 429 or status >= 500
+
+    def get_json(self, url, empty_data=None):
+        for attempt in range(self.config.story_fetch_max_retries + 1):
+            if not self.breaker.allow():
+                self.stats.add('rejected')
+                return empty_data
+            if attempt > 0:
+                self.stats.add('retries')
+                time.sleep(self.get_backoff_delay(attempt))
+
+            self.stats.add('requests')
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if self.is_retryable_status(response.status_code):
+                    raise HackernewsRetryableError(f'{response.status_code} for url: {url}')
+                response.raise_for_status()
+                data = response.json()
+            except (requests.ConnectionError, requests.Timeout, HackernewsRetryableError) as e:
+                self.breaker.record_failure()
+                LOG.error(f'请求失败({attempt+1}): {e}')
+                continue
+            except Exception as e:
+                # not retryable, e.g. 404 or invalid json
+                self.breaker.record_success()
+                self.stats.add('failures')
+                LOG.error(str(e))
+                return empty_data
+
+            self.breaker.record_success()
+            return data
+
+        self.stats.add('failures')
+        return empty_data
+
+    async def aio_get_json(self, session: aiohttp.ClientSession, url, semaphore: asyncio.Semaphore, empty_data=None):
+        for attempt in range(self.config.story_fetch_max_retries + 1):
+            if not self.breaker.allow():
+                self.stats.add('rejected')
+                return empty_data
+            if attempt > 0:
+                self.stats.add('retries')
+                await asyncio.sleep(self.get_backoff_delay(attempt))
+
+            self.stats.add('requests')
+            try:
+                async with semaphore:
+                    async with session.get(url) as response:
+                        if self.is_retryable_status(response.status):
+                            raise HackernewsRetryableError(f'{response.status} for url: {url}')
+                        response.raise_for_status()
+                        data = await response.json()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError, HackernewsRetryableError) as e:
+                self.breaker.record_failure()
+                LOG.error(f'下载失败({attempt+1}): {e}')
+                continue
+            except Exception as e:
+                self.breaker.record_success()
+                self.stats.add('failures')
+                LOG.error(f'下载失败: {e}')
+                return empty_data
+
+            self.breaker.record_success()
+            return data
+
+        self.stats.add('failures')
+        return empty_data
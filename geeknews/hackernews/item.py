@@ -0,0 +1,101 @@
+import time
+import random
+from dataclasses import dataclass, field, fields
+from geeknews.utils import codec
+from geeknews.utils.logger import LOG
+from geeknews.utils.date import GeeknewsDate
+
+
+@dataclass(slots=True)
+class HackernewsItem:
+    '''
+    Typed record of HN item (story or comment), see https://github.com/HackerNews/API#items
+    Items are stored and passed between stages as dict (same as HN api), convert with from_dict / to_dict.
+    '''
+    id: int = 0
+    type: str = ''
+    by: str = ''
+    time: int = 0
+    title: str = ''
+    url: str = ''
+    text: str = ''
+    score: int = 0
+    descendants: int = 0
+    parent: int = 0
+    kids: list = field(default_factory=list)
+    dead: bool = False
+    deleted: bool = False
+    article: bool = False   # marked by api client, should read link and comments
+    comments: list = field(default_factory=list)    # nested comment items fetched by api client
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        if not isinstance(data, dict):
+            return cls()
+        values = {k: v for k, v in data.items() if k in HN_ITEM_FIELDS and v is not None}
+        if 'comments' in values:
+            values['comments'] = [cls.from_dict(c) for c in values['comments']]
+        return cls(**values)
+
+    def to_dict(self):
+        '''Same format as HN api, fields with default value are omitted.'''
+        result = {}
+        for name, default in HN_ITEM_DEFAULTS.items():
+            value = getattr(self, name)
+            if value != default:
+                result[name] = value
+        if self.comments:
+            result['comments'] = [c.to_dict() for c in self.comments]
+        return result
+
+
+HN_ITEM_FIELDS = frozenset(f.name for f in fields(HackernewsItem))
+HN_ITEM_DEFAULTS = {f.name: getattr(HackernewsItem(), f.name) for f in fields(HackernewsItem) if f.name != 'comments'}
+
+
+def benchmark_item_codec(date=GeeknewsDate.now(), repeat=5):
+    '''Compare stdlib json and codec backend on items of date (or generated items if not found).'''
+    import json
+    from geeknews.hackernews.config import HackernewsConfig
+    from geeknews.hackernews.data_path import HackernewsDataPathManager
+
+    config = HackernewsConfig.get_from_parser()
+    dpm = HackernewsDataPathManager(config)
+    store = dpm.get_item_store()
+
+    items = []
+    if hasattr(store, 'connection'):
+        rows = store.connection.execute('SELECT data FROM items WHERE date = ?', (store.get_date_key(date),))
+        items = [codec.loads(data) for data, in rows]
+    if not items:
+        now = int(time.time())
+        for i in range(3000):
+            items.append({
+                'id': 40000000 + i,
+                'type': 'comment' if i % 10 else 'story',
+                'by': f'user{i}',
+                'time': now - random.randint(0, 86400),
+                'title': f'Story title {i} 极客',
+                'text': 'Lorem ipsum <i>dolor</i> sit amet, consectetur adipiscing elit. ' * random.randint(1, 20),
+                'score': random.randint(0, 1000),
+                'kids': [40100000 + i * 10 + k for k in range(random.randint(0, 10))],
+            })
+
+    encoded_items = [json.dumps(item, ensure_ascii=False) for item in items]
+    total_mb = sum(len(x.encode('utf-8')) for x in encoded_items) / 1024 / 1024
+
+    cases = [
+        ('json.loads', lambda: [json.loads(x) for x in encoded_items]),
+        (f'{codec.JSON_BACKEND}.loads', lambda: [codec.loads(x) for x in encoded_items]),
+        ('json.dumps', lambda: [json.dumps(x, ensure_ascii=False) for x in items]),
+        (f'{codec.JSON_BACKEND}.dumps', lambda: [codec.dumps(x) for x in items]),
+        ('from_dict', lambda: [HackernewsItem.from_dict(x) for x in items]),
+    ]
+
+    LOG.info(f'benchmark: {len(items)} items, {total_mb:.2f} MB')
+    for name, func in cases:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - start) / repeat
+        LOG.info(f'{name}: {elapsed*1000:.1f} ms/run, {len(items)/elapsed:,.0f} items/s, {total_mb/elapsed:.1f} MB/s')
@@ -0,0 +1,69 @@
+import time
+from geeknews.hackernews.config import HackernewsConfig
+from geeknews.hackernews.item_store import HackernewsItemStore
+
+# Fields which may change after the item is posted, other fields (title, url, by, text, time...) are reused from cache.
+HN_VOLATILE_FIELDS = ('score', 'descendants', 'kids', 'dead', 'deleted')
+
+
+class HackernewsItemCache:
+    '''
+    Global item cache keyed by item id with fetch timestamp, shared across dates.
+    A cached item within ttl is reused directly, otherwise it should be downloaded again
+    and only volatile fields are refreshed.
+    '''
+
+    def __init__(self, config: HackernewsConfig, item_store: HackernewsItemStore):
+        self.config = config
+        self.item_store = item_store
+
+    @property
+    def ttl(self):
+        return self.config.item_cache_ttl_minutes * 60
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def get_fresh_items(self, ids):
+        '''Return {id: item} for cached items within ttl.'''
+        if not self.enabled or not ids:
+            return {}
+
+        now = time.time()
+        entries = self.item_store.get_cached_many(ids)
+        return {id: item for id, (item, fetched_at) in entries.items() if now - fetched_at < self.ttl}
+
+    def refresh(self, downloaded_items: dict):
+        '''
+        Merge downloaded items {id: item} into cache and return merged items.
+        If download failed (empty item), fallback to the stale cached item.
+        '''
+        if not self.enabled or not downloaded_items:
+            return {id: item for id, item in downloaded_items.items() if item}
+
+        entries = self.item_store.get_cached_many(downloaded_items.keys())
+        results = {}
+        refreshed = {}
+
+        for id, item in downloaded_items.items():
+            cached_item = entries[id][0] if id in entries else {}
+            if item:
+                merged_item = self.merge(cached_item, item) if cached_item else item
+                refreshed[id] = merged_item
+                results[id] = merged_item
+            elif cached_item:
+                results[id] = cached_item
+
+        self.item_store.save_cached_many(refreshed, time.time())
+        return results
+
+    @staticmethod
+    def merge(cached_item: dict, item: dict):
+        merged_item = dict(cached_item)
+        for key in HN_VOLATILE_FIELDS:
+            if key in item:
+                merged_item[key] = item[key]
+            elif key in merged_item:
+                del merged_item[key]
+        return merged_item
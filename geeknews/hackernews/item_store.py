@@ -0,0 +1,220 @@
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from geeknews.utils.logger import LOG
+from geeknews.utils.date import GeeknewsDate
+from geeknews.utils import codec
+from geeknews.hackernews.config import HackernewsConfig
+
+
+class HackernewsItemStore(ABC):
+    '''Storage of HN items (stories and comments) grouped by date.'''
+
+    def __init__(self, config: HackernewsConfig, datapath_manager):
+        self.config = config
+        self.datapath_manager = datapath_manager
+
+    def get(self, id, date=GeeknewsDate.now()):
+        return self.get_many([id], date).get(int(id), {})
+
+    @abstractmethod
+    def get_many(self, ids, date=GeeknewsDate.now()):
+        '''Return {id: item} for items found in store.'''
+        pass
+
+    def save(self, id, item, date=GeeknewsDate.now()):
+        self.save_many({id: item}, date)
+
+    @abstractmethod
+    def save_many(self, items: dict, date=GeeknewsDate.now()):
+        '''Save {id: item} in one batch.'''
+        pass
+
+    @abstractmethod
+    def clean(self, date=GeeknewsDate.now()):
+        pass
+
+    @abstractmethod
+    def get_cached_many(self, ids):
+        '''Return {id: (item, fetched_at)} from the global item cache (not grouped by date).'''
+        pass
+
+    @abstractmethod
+    def save_cached_many(self, items: dict, fetched_at):
+        pass
+
+    def close(self):
+        pass
+
+
+class HackernewsJsonItemStore(HackernewsItemStore):
+    '''Legacy storage: one {id}.json file for each item under story date dir.'''
+
+    def get_many(self, ids, date=GeeknewsDate.now()):
+        results = {}
+        for id in ids:
+            story_path = self.datapath_manager.get_story_file_path(id, date)
+            if os.path.exists(story_path):
+                with open(story_path) as f:
+                    results[int(id)] = codec.load(f)
+        return results
+
+    def save_many(self, items: dict, date=GeeknewsDate.now()):
+        for id, item in items.items():
+            story_path = self.datapath_manager.get_story_file_path(id, date)
+            with open(story_path, 'w') as f:
+                codec.dump(item, f)
+
+    def clean(self, date=GeeknewsDate.now()):
+        story_dir = self.datapath_manager.get_story_date_dir(date)
+        for filename in os.listdir(story_dir):
+            name, ext = os.path.splitext(filename)
+            if name.isdigit() and ext == '.json':
+                os.remove(os.path.join(story_dir, filename))
+
+    def get_cached_many(self, ids):
+        cache_dir = self.datapath_manager.get_item_cache_dir()
+        results = {}
+        for id in ids:
+            cache_path = os.path.join(cache_dir, f'{id}.json')
+            if os.path.exists(cache_path):
+                with open(cache_path) as f:
+                    entry = codec.load(f)
+                results[int(id)] = (entry['item'], entry['fetched_at'])
+        return results
+
+    def save_cached_many(self, items: dict, fetched_at):
+        cache_dir = self.datapath_manager.get_item_cache_dir()
+        for id, item in items.items():
+            cache_path = os.path.join(cache_dir, f'{id}.json')
+            with open(cache_path, 'w') as f:
+                codec.dump({'item': item, 'fetched_at': fetched_at}, f)
+
+
+class HackernewsSqliteItemStore(HackernewsItemStore):
+    '''All items in a single SQLite database (WAL mode), keyed by (date, id).'''
+
+    def __init__(self, config: HackernewsConfig, datapath_manager):
+        super().__init__(config, datapath_manager)
+        self.db_path = datapath_manager.get_item_store_path()
+        self.local = threading.local()
+
+    @property
+    def connection(self):
+        # sqlite connection can not be shared across threads or forked processes.
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+
+        db_dir = os.path.dirname(self.db_path)
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS items (date TEXT NOT NULL, id INTEGER NOT NULL, data TEXT NOT NULL, PRIMARY KEY (date, id))')
+        conn.execute('CREATE TABLE IF NOT EXISTS item_cache (id INTEGER PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)')
+        conn.commit()
+
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    def get_date_key(self, date):
+        return self.datapath_manager._get_date(date).formatted
+
+    def get_many(self, ids, date=GeeknewsDate.now()):
+        rows = self.select_by_ids('SELECT id, data FROM items WHERE date = ? AND id IN ({})', ids, [self.get_date_key(date)])
+        return {id: codec.loads(data) for id, data in rows}
+
+    def select_by_ids(self, sql, ids, params=[]):
+        ids = list(map(int, ids))
+        rows = []
+        # keep below SQLITE_MAX_VARIABLE_NUMBER
+        for start in range(0, len(ids), 500):
+            batch_ids = ids[start:start+500]
+            placeholders = ','.join('?' * len(batch_ids))
+            rows.extend(self.connection.execute(sql.format(placeholders), params + batch_ids))
+        return rows
+
+    def save_many(self, items: dict, date=GeeknewsDate.now()):
+        if not items:
+            return
+
+        date_key = self.get_date_key(date)
+        rows = [(date_key, int(id), codec.dumps(item)) for id, item in items.items()]
+        with self.connection as conn:
+            conn.executemany('INSERT OR REPLACE INTO items (date, id, data) VALUES (?, ?, ?)', rows)
+
+    def clean(self, date=GeeknewsDate.now()):
+        with self.connection as conn:
+            conn.execute('DELETE FROM items WHERE date = ?', (self.get_date_key(date),))
+
+    def get_cached_many(self, ids):
+        rows = self.select_by_ids('SELECT id, data, fetched_at FROM item_cache WHERE id IN ({})', ids)
+        return {id: (codec.loads(data), fetched_at) for id, data, fetched_at in rows}
+
+    def save_cached_many(self, items: dict, fetched_at):
+        if not items:
+            return
+
+        rows = [(int(id), codec.dumps(item), fetched_at) for id, item in items.items()]
+        with self.connection as conn:
+            conn.executemany('INSERT OR REPLACE INTO item_cache (id, data, fetched_at) VALUES (?, ?, ?)', rows)
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+def create_item_store(config: HackernewsConfig, datapath_manager) -> HackernewsItemStore:
+    if config.item_store == 'json':
+        return HackernewsJsonItemStore(config, datapath_manager)
+    elif config.item_store == 'sqlite':
+        return HackernewsSqliteItemStore(config, datapath_manager)
+    else:
+        LOG.error(f'未知的item_store: {config.item_store}, 使用sqlite')
+        return HackernewsSqliteItemStore(config, datapath_manager)
+
+
+def migrate_json_items(datapath_manager, item_store: HackernewsItemStore, remove_files=False):
+    '''
+    Import {id}.json files of every date dir under story_dir into item store.
+    If remove_files, only files which are imported successfully are removed.
+    '''
+    story_dir = datapath_manager.config.story_dir
+    if not os.path.exists(story_dir):
+        return 0
+
+    total_count = 0
+    for dir_path, _, filenames in os.walk(story_dir):
+        components = os.path.relpath(dir_path, story_dir).split(os.sep)
+        if len(components) != 3 or not all(map(str.isdigit, components)):
+            continue
+
+        item_names = [x for x in filenames if x.endswith('.json') and x[:-5].isdigit()]
+        if not item_names:
+            continue
+
+        items = {}
+        for filename in item_names:
+            with open(os.path.join(dir_path, filename)) as f:
+                try:
+                    items[int(filename[:-5])] = codec.load(f)
+                except ValueError as e:
+                    LOG.error(f'迁移失败: {filename}, {e}')
+
+        year, month, day = map(int, components)
+        item_store.save_many(items, GeeknewsDate(year, month, day))
+        total_count += len(items)
+        LOG.debug(f'完成迁移: {dir_path}, 数量: {len(items)}')
+
+        if remove_files and not isinstance(item_store, HackernewsJsonItemStore):
+            for id in items.keys():
+                os.remove(os.path.join(dir_path, f'{id}.json'))
+
+    return total_count
@@ -1,12 +1,13 @@
 import os
 import re
-import json
+import asyncio
 
 from geeknews.configparser import GeeknewsConfigParser
 from geeknews.llm import LLM
 
 from geeknews.utils.logger import LOG
 from geeknews.utils.date import GeeknewsDate
+from geeknews.utils import codec
 from geeknews.utils.md2html import MarkdownRenderer
 
 from geeknews.hackernews.config import HackernewsConfig
@@ -15,6 +16,9 @@ from geeknews.hackernews.api_client import HackernewsClient
 from geeknews.hackernews.article_editor import HackernewsArticleEditor
 from geeknews.hackernews.summary_writer import HackernewsSummaryWriter
 from geeknews.hackernews.report_writer import HackernewsReportWriter
+from geeknews.hackernews.subscriber import HackernewsSubscriber
+from geeknews.hackernews.daily_edition import HackernewsDailyEdition
+from geeknews.hackernews.pipeline import HackernewsPipeline
 
 class HackernewsManager:
 
@@ -25,24 +29,92 @@ class HackernewsManager:
         self.article_editor = HackernewsArticleEditor(llm, config, dpm)
         self.summary_writer = HackernewsSummaryWriter(llm, config, dpm)
         self.report_writer = HackernewsReportWriter(dpm)
+        self.pipeline = HackernewsPipeline(config, self.api_client, self.article_editor, self.summary_writer)
         self.datapath_manager = dpm
+        self.daily_edition = None # HackernewsDailyEdition of last generated report
+    
+    def start_subscriber(self):
+        if not self.api_client.subscriber:
+            self.api_client.subscriber = HackernewsSubscriber(self.config, self.api_client)
+        self.api_client.subscriber.start()
+    
+    def stop_subscriber(self):
+        if self.api_client.subscriber:
+            self.api_client.subscriber.stop()
+            self.api_client.subscriber = None
     
     def generate_daily_report(self, locale='zh_cn', date=GeeknewsDate.now(), override=False):
-        self.api_client.fetch_daily_stories(date)
-        self.article_editor.generate_topstories_articles(date)
-        self.summary_writer.generate_daily_summaries(locale, date, override)
-        self.report_writer.generate_html_report('web', locale=locale, date=date, override=override)
-        self.report_writer.generate_html_report('wpp', locale=locale, date=date, override=override)
+        '''
+        Entry of daily report. In concurrent mode all stages run in one event loop (aio_generate_daily_report),
+        otherwise the sync stages run one by one.
+        '''
+        if self.config.story_fetch_concurrent:
+            asyncio.run(self.aio_generate_daily_report(locale, date, override))
+            return
+        
+        # stories, articles and summaries are passed through stages in memory
+        edition = self.api_client.fetch_daily_stories(date)
+        self.article_editor.generate_topstories_articles(date, edition)
+        self.summary_writer.generate_daily_summaries(locale, date, override, edition)
+        self.generate_daily_html_reports(locale, date, override, edition)
+
+    async def aio_generate_daily_report(self, locale='zh_cn', date=GeeknewsDate.now(), override=False):
+        '''Run the whole day in one event loop, HN session, crawl session and llm clients are opened here and shared by all stages.'''
+        # in stream mode at most pipeline_relevance_workers pages are checked at the same time
+        relevance_concurrency = max(self.config.pipeline_relevance_workers, 1) if self.config.pipeline_mode == 'stream' else 0
+        relevance_checker = self.article_editor.relevance_checker
+        async with self.llm.aio_scope(), self.api_client.aio_session_scope(), self.article_editor.crawler.aio_session_scope(), relevance_checker.aio_scope(relevance_concurrency):
+            if self.config.pipeline_mode == 'stream':
+                edition = await self.pipeline.run(locale, date, override)
+            else:
+                edition = await self.api_client.aio_fetch_daily_stories(date)
+                await self.article_editor.aio_generate_topstories_articles(date, edition)
+                await self.summary_writer.aio_generate_daily_summaries(locale, date, override, edition)
+        
+        self.generate_daily_html_reports(locale, date, override, edition)
+
+    def rebuild_daily_report(self, locale='zh_cn', date=GeeknewsDate.now()):
+        return asyncio.run(self.aio_rebuild_daily_report(locale, date))
+
+    async def aio_rebuild_daily_report(self, locale='zh_cn', date=GeeknewsDate.now()):
+        '''
+        Rebuild report of a past date from stored stories (HN api can not fetch historical topstories).
+        Existing articles are reused, missing articles are crawled again, summaries and reports are regenerated.
+        '''
+        edition = HackernewsDailyEdition.load(self.datapath_manager, locale, date)
+        if not edition.stories:
+            LOG.error(f'无法重建报告, 没有stories数据: {date}')
+            return None
+        
+        async with self.llm.aio_scope(), self.article_editor.crawler.aio_session_scope(), self.article_editor.relevance_checker.aio_scope():
+            await self.article_editor.aio_generate_topstories_articles(date, edition)
+            await self.summary_writer.aio_generate_daily_summaries(locale, date, True, edition)
+        
+        self.generate_daily_html_reports(locale, date, True, edition)
+        return edition
+
+    def generate_daily_html_reports(self, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
+        self.report_writer.generate_html_report('web', locale=locale, date=date, override=override, edition=edition)
+        self.report_writer.generate_html_report('wpp', locale=locale, date=date, override=override, edition=edition)
+        self.daily_edition = edition
+
+    def get_daily_edition(self, date=GeeknewsDate.now()):
+        '''Return in-memory edition of date if it was generated in this process.'''
+        if self.daily_edition and str(self.daily_edition.date) == str(date):
+            return self.daily_edition
+        return None
 
     def get_daily_top_story_title_and_content(self, locale='zh_cn', date=GeeknewsDate.now(), limit=None):
+        edition = self.get_daily_edition(date)
+
         # find story id from topstories.json
-        story_id = self.api_client.get_story_id_with_highest_score('topstories', article_only=True, date=date)
+        story_id = self.api_client.get_story_id_with_highest_score('topstories', article_only=True, date=date, edition=edition)
         if story_id <= 0:
             LOG.error('无法生成热点标题: 未能找到合适的数据')
             return '', ''
         
         # find title from summaries
-        translated_title, summary = self.summary_writer.find_summary_title_and_content(story_id, locale, date, limit)
+        translated_title, summary = self.summary_writer.find_summary_title_and_content(story_id, locale, date, limit, edition)
         if not translated_title:
             LOG.error(f'无法生成热点标题: {story_id}, {locale}, {date.joined_path}')
             return '', ''
@@ -68,7 +140,8 @@ class HackernewsManager:
         return self.update_preview_json_with_translation(date, locale)
 
     def generate_preview_markdown(self, date=GeeknewsDate.now(), locale='zh_cn'):
-        preview_path = self.api_client.generate_preview(date)
+        edition = HackernewsDailyEdition(date)
+        preview_path = self.api_client.generate_preview(date, edition=edition)
         
         self.summary_writer.generate_story_list_summary(
             story_list_path=preview_path,
@@ -76,6 +149,7 @@ class HackernewsManager:
             date=date,
             override=True,
             preview=True,
+            short_stories=edition.preview_stories,
         )
         
         return self.get_preview_markdown_path(date, locale)
@@ -101,7 +175,7 @@ class HackernewsManager:
             return preview_json_path
         
         with open(preview_json_path) as f:
-            preview_objs = json.load(f)
+            preview_objs = codec.load(f)
 
         with open(preview_md_path) as f:
             preview_md = f.read()
@@ -123,7 +197,7 @@ class HackernewsManager:
             item["title"] = translation[str(id)]
         
         with open(preview_json_path, 'w') as f:
-            json.dump(preview_objs, f, ensure_ascii=False)
+            codec.dump(preview_objs, f)
 
         return preview_json_path
 
@@ -0,0 +1,214 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from geeknews.utils import codec
+from geeknews.utils.logger import LOG
+from geeknews.hackernews.config import HackernewsConfig
+
+
+# query params which do not change page content (and utm_*)
+TRACKING_PARAMS = frozenset(['ref', 'ref_src', 'fbclid', 'gclid'])
+# writes between two eviction scans, unless the estimated size is over limit
+EVICT_INTERVAL_WRITES = 100
+# LRU eviction frees pages down to this ratio of crawl_cache_max_mb, so next writes do not scan again at once
+EVICT_TARGET_RATIO = 0.9
+
+
+@dataclass(slots=True)
+class HackernewsCachedPage:
+    url: str
+    body: str
+    etag: str = ''
+    last_modified: str = ''
+
+
+class HackernewsPageCache:
+    '''
+    HTTP cache of crawled pages in SQLite, keyed by normalized url.
+    - stores body, headers, ETag and Last-Modified, crawler revalidates with If-None-Match / If-Modified-Since.
+    - markdown extracted from body is stored with the hash of body and the extract backend, so unchanged pages are not extracted again.
+    - evicts pages older than crawl_cache_max_days, then least recently used pages when above crawl_cache_max_mb.
+      eviction scans the table only every EVICT_INTERVAL_WRITES writes, or when the size estimated from writes is over limit.
+    '''
+
+    def __init__(self, config: HackernewsConfig, db_path):
+        self.config = config
+        self.db_path = db_path
+        self.local = threading.local()
+        self.evict_lock = threading.Lock()
+        self.write_count = 0
+        self.estimated_size = None # total size of last eviction plus written sizes since then
+
+    @property
+    def enabled(self):
+        return self.config.crawl_cache
+
+    @property
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+
+        db_dir = os.path.dirname(self.db_path)
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, url TEXT NOT NULL, body TEXT NOT NULL, body_hash TEXT NOT NULL, headers TEXT, etag TEXT, last_modified TEXT, markdown TEXT, markdown_backend TEXT, size INTEGER NOT NULL, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at)')
+        conn.commit()
+
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def normalize_url(url):
+        '''Lowercase scheme and host, drop fragment, default port and tracking params, sort query.'''
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        netloc = parts.netloc.lower()
+        if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+            netloc = netloc.rsplit(':', 1)[0]
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not k.startswith('utm_') and k not in TRACKING_PARAMS]
+        return urlunsplit((scheme, netloc, parts.path or '/', urlencode(sorted(query)), ''))
+
+    def get_key(self, url):
+        return hashlib.sha256(self.normalize_url(url).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_body_hash(body):
+        return hashlib.sha256(body.encode('utf-8', errors='replace')).hexdigest()
+
+    def get(self, url):
+        '''Return cached page to revalidate, or None.'''
+        if not self.enabled:
+            return None
+        try:
+            row = self.connection.execute('SELECT body, etag, last_modified FROM pages WHERE key = ?', (self.get_key(url),)).fetchone()
+        except sqlite3.Error as e:
+            LOG.error(f'读取网页缓存出错: {e}')
+            return None
+        if row is None:
+            return None
+        return HackernewsCachedPage(url, row[0], row[1] or '', row[2] or '')
+
+    def get_conditional_headers(self, page: HackernewsCachedPage):
+        headers = {}
+        if page is None:
+            return headers
+        if page.etag:
+            headers['If-None-Match'] = page.etag
+        if page.last_modified:
+            headers['If-Modified-Since'] = page.last_modified
+        return headers
+
+    def touch(self, url):
+        '''Mark page as revalidated (304) and recently used.'''
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            with self.connection as conn:
+                conn.execute('UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE key = ?', (now, now, self.get_key(url)))
+        except sqlite3.Error as e:
+            LOG.error(f'更新网页缓存出错: {e}')
+
+    def set(self, url, body, headers):
+        if not self.enabled or not body:
+            return
+        now = time.time()
+        key = self.get_key(url)
+        body_hash = self.get_body_hash(body)
+        size = len(body)
+        try:
+            with self.connection as conn:
+                # keep converted markdown if body is not changed
+                row = conn.execute('SELECT markdown, markdown_backend FROM pages WHERE key = ? AND body_hash = ?', (key, body_hash)).fetchone()
+                markdown, markdown_backend = row if row else (None, None)
+                size += len(markdown or '')
+                conn.execute(
+                    'INSERT OR REPLACE INTO pages (key, url, body, body_hash, headers, etag, last_modified, markdown, markdown_backend, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key, url, body, body_hash, codec.dumps(headers), headers.get('etag', ''), headers.get('last-modified', ''), markdown, markdown_backend, size, now, now),
+                )
+        except sqlite3.Error as e:
+            LOG.error(f'写入网页缓存出错: {e}')
+            return
+        if self.should_evict(size):
+            self.evict()
+
+    @property
+    def max_size(self):
+        return self.config.crawl_cache_max_mb * 1024 * 1024
+
+    def should_evict(self, written_size):
+        '''Count a write, return True if eviction scan is due. Replaced pages are counted again, so size is over estimated.'''
+        with self.evict_lock:
+            self.write_count += 1
+            if self.estimated_size is not None:
+                self.estimated_size += written_size
+            if self.estimated_size is None or self.write_count >= EVICT_INTERVAL_WRITES or self.estimated_size > self.max_size:
+                self.write_count = 0
+                return True
+            return False
+
+    def get_markdown(self, url, body, backend=''):
+        '''Return markdown extracted from the same body by the same backend before, or None.'''
+        if not self.enabled or not body:
+            return None
+        try:
+            row = self.connection.execute(
+                'SELECT markdown FROM pages WHERE key = ? AND body_hash = ? AND markdown_backend = ?',
+                (self.get_key(url), self.get_body_hash(body), backend),
+            ).fetchone()
+        except sqlite3.Error as e:
+            LOG.error(f'读取网页缓存出错: {e}')
+            return None
+        return row[0] if row else None
+
+    def set_markdown(self, url, body, markdown, backend=''):
+        if not self.enabled or not body:
+            return
+        try:
+            with self.connection as conn:
+                conn.execute(
+                    'UPDATE pages SET markdown = ?, markdown_backend = ?, size = length(body) + ? WHERE key = ? AND body_hash = ?',
+                    (markdown, backend, len(markdown), self.get_key(url), self.get_body_hash(body)),
+                )
+        except sqlite3.Error as e:
+            LOG.error(f'写入网页缓存出错: {e}')
+
+    def evict(self):
+        '''Delete expired pages, then least recently used pages until total size is under EVICT_TARGET_RATIO of limit.'''
+        max_size = self.max_size
+        target_size = max_size * EVICT_TARGET_RATIO
+        expired_at = time.time() - self.config.crawl_cache_max_days * 86400
+        try:
+            with self.connection as conn:
+                conn.execute('DELETE FROM pages WHERE fetched_at < ?', (expired_at,))
+                total_size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+                removed_keys = []
+                if total_size > max_size:
+                    # read oldest pages only until enough size is freed
+                    cursor = conn.execute('SELECT key, size FROM pages ORDER BY accessed_at ASC')
+                    for key, size in cursor:
+                        if total_size <= target_size:
+                            break
+                        removed_keys.append((key,))
+                        total_size -= size
+                    cursor.close()
+                    conn.executemany('DELETE FROM pages WHERE key = ?', removed_keys)
+        except sqlite3.Error as e:
+            LOG.error(f'清理网页缓存出错: {e}')
+            return
+        with self.evict_lock:
+            self.estimated_size = total_size
+        if removed_keys:
+            LOG.debug(f'清理网页缓存: {len(removed_keys)}个页面')
@@ -0,0 +1,139 @@
+import os
+import time
+import asyncio
+
+from geeknews.utils.logger import LOG
+from geeknews.utils.date import GeeknewsDate
+from geeknews.hackernews.config import HackernewsConfig
+from geeknews.hackernews.api_client import HackernewsClient
+from geeknews.hackernews.article_editor import HackernewsArticleEditor
+from geeknews.hackernews.summary_writer import HackernewsSummaryWriter
+from geeknews.hackernews.daily_edition import HackernewsDailyEdition
+
+
+class HackernewsPipeline:
+    '''
+    Streaming daily pipeline: fetch -> crawl -> relevance -> summarize.
+    Stages are connected by asyncio queues and each stage has its own workers,
+    so every story moves to next stage as soon as it is ready, instead of waiting for the slowest story of a stage.
+    '''
+
+    def __init__(self, config: HackernewsConfig, api_client: HackernewsClient, article_editor: HackernewsArticleEditor, summary_writer: HackernewsSummaryWriter):
+        self.config = config
+        self.api_client = api_client
+        self.article_editor = article_editor
+        self.summary_writer = summary_writer
+
+    async def run(self, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
+        '''Run the whole day in current event loop, return daily edition. HN session, crawl session and llm clients are from the caller's scopes.'''
+        if edition is None:
+            edition = HackernewsDailyEdition(date)
+
+        start_time = time.perf_counter()
+        self.api_client.fetcher.stats.reset()
+
+        LOG.debug(f'开始请求top stories')
+        story_ids = await self.api_client.aio_fetch_top_story_ids()
+        story_ids = await self.api_client.aio_custom_rank_ids(story_ids, date=date, priority=True)
+        story_ids = story_ids[:self.config.daily_story_max_count]
+        LOG.debug(f'[流水线]开始处理stories, 数量: {len(story_ids)}')
+
+        fetch_queue = asyncio.Queue()
+        crawl_queue = asyncio.Queue()
+        relevance_queue = asyncio.Queue()
+        summary_queue = asyncio.Queue()
+        fetched_items = {}
+
+        async def fetch(index, id):
+            mark_article = index < self.config.daily_article_max_count
+            comment_limit = self.config.each_story_max_comment_count if self.config.summary_with_comments else 0
+            item = await self.api_client.aio_get_item(
+                id=id,
+                item_type='story',
+                parent_id=None,
+                recursive=mark_article if self.config.summary_with_comments else False,
+                remain_comment_count=comment_limit if mark_article else 0,
+                current_num=index+1,
+                mark_article=mark_article,
+                date=date,
+            )
+            fetched_items[index] = item
+            if mark_article and item.get('id'):
+                crawl_queue.put_nowait(item)
+
+        async def crawl(item):
+            story = self.article_editor.parse_stories([item])[0]
+            article_path = self.article_editor.datapath_manager.get_article_file_path(story.id, date)
+            if os.path.exists(article_path) or self.article_editor.reuse_indexed_article(story, article_path):
+                self.article_editor.load_article(story.id, article_path, edition)
+                summary_queue.put_nowait(story.id)
+                return
+            if not self.article_editor.support_story(story):
+                await self.article_editor.aio_save_article(story, '', article_path, edition)
+                return
+            text = await self.article_editor.aio_generate_article_text(story)
+            relevance_queue.put_nowait((story, text, article_path))
+
+        async def check_relevance(story, text, article_path):
+            article = ''
+            if await self.article_editor.aio_validate_article_text(story, text):
+                article = self.article_editor.construct_article_components(story, text)
+            await self.article_editor.aio_save_article(story, article, article_path, edition)
+            if article:
+                summary_queue.put_nowait(story.id)
+
+        async def summarize(story_id):
+            await self.summary_writer.aio_generate_summary(story_id, edition.articles[story_id], locale, date, override, edition)
+            LOG.debug(f'[流水线]{story_id} 完成, 用时{time.perf_counter() - start_time:.1f}秒')
+
+        workers = []
+        workers += self.start_workers('fetch', fetch_queue, fetch, self.config.pipeline_fetch_workers)
+        workers += self.start_workers('crawl', crawl_queue, crawl, self.config.pipeline_crawl_workers)
+        workers += self.start_workers('relevance', relevance_queue, check_relevance, self.config.pipeline_relevance_workers)
+        workers += self.start_workers('summary', summary_queue, summarize, self.config.pipeline_summary_workers)
+
+        for index, id in enumerate(story_ids):
+            fetch_queue.put_nowait((index, id))
+
+        try:
+            # every stage only produces to later stages, so the queues are drained in order
+            await fetch_queue.join()
+            stories = [fetched_items[index] for index in sorted(fetched_items)]
+            self.api_client.save_daily_stories(stories, date, edition)
+            LOG.info(f'获取stories结束: {self.api_client.fetcher.stats.summary()}')
+
+            # translate story list while articles are still being processed
+            story_list_task = asyncio.create_task(self.aio_generate_story_list_summary(locale, date, override, edition))
+
+            await crawl_queue.join()
+            await relevance_queue.join()
+            await summary_queue.join()
+            await story_list_task
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.to_thread(self.article_editor.close_markdown_executor)
+
+        LOG.info(f'[流水线]完成: 文章{len(edition.articles)}篇, 拒绝{len(edition.rejected_ids)}篇, 用时{time.perf_counter() - start_time:.1f}秒')
+        return edition
+
+    def start_workers(self, name, queue: asyncio.Queue, handler, count):
+        return [asyncio.create_task(self.work(name, queue, handler)) for _ in range(max(count, 1))]
+
+    async def work(self, name, queue: asyncio.Queue, handler):
+        while True:
+            args = await queue.get()
+            try:
+                if isinstance(args, tuple):
+                    await handler(*args)
+                else:
+                    await handler(args)
+            except Exception as e:
+                LOG.error(f'[流水线]{name}出错: {e}')
+            finally:
+                queue.task_done()
+
+    async def aio_generate_story_list_summary(self, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
+        # translation is a blocking llm call, run it in thread
+        await asyncio.to_thread(self.summary_writer.generate_short_story_summary, locale, date, override, edition)
@@ -0,0 +1,212 @@
+import re
+import time
+import random
+from geeknews.utils.logger import LOG
+
+JOB_TITLE_RE = re.compile(r'\(YC\s\w\d+\)\s\w+\s[Hh]iring')
+
+
+class HackernewsRankingEngine:
+    '''
+    Rank stories in one pass with pluggable rules:
+    - filter rules: drop stories, e.g. not recent, job hiring.
+    - key rules: components of composite sort key, all stories are ordered by one stable sort.
+    - rise rules: stories after article window (top n) which are moved right after the window, stories in window stay.
+    - sink rules: stories which should not be placed in article window (top n), they are moved right after the window.
+    Every rule is evaluated once per story. Filter and key rules can also be batch rules,
+    which take the whole story list and return one value per story (e.g. numpy vectorized).
+    '''
+
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self.filter_rules = []
+        self.key_rules = []
+        self.rise_rules = []
+        self.sink_rules = []
+
+    def register_filter(self, rule, batch=False):
+        '''rule(story) -> bool, False to drop the story. Batch rule(stories) -> bool per story.'''
+        self.filter_rules.append((rule, batch))
+        return self
+
+    def register_key(self, rule, batch=False):
+        '''rule(story) -> comparable, smaller value ranks higher. Batch rule(stories) -> comparable per story.'''
+        self.key_rules.append((rule, batch))
+        return self
+
+    def register_rise(self, rule):
+        '''rule(story) -> bool, True to move story from behind article window to the window boundary.'''
+        self.rise_rules.append(rule)
+        return self
+
+    def register_sink(self, rule):
+        '''rule(story) -> bool, True to keep story out of article window.'''
+        self.sink_rules.append(rule)
+        return self
+
+    def rank(self, stories):
+        for rule, batch in self.filter_rules:
+            if batch:
+                stories = [s for s, keep in zip(stories, rule(stories)) if keep]
+            else:
+                stories = [s for s in stories if rule(s)]
+
+        if self.key_rules:
+            columns = [rule(stories) if batch else [rule(s) for s in stories] for rule, batch in self.key_rules]
+            keys = list(zip(*columns))
+            order = sorted(range(len(stories)), key=keys.__getitem__)
+            stories = [stories[i] for i in order]
+
+        if self.window_size >= len(stories):
+            return stories
+
+        if self.rise_rules:
+            rise_rules = self.rise_rules
+            window, rest = stories[:self.window_size], stories[self.window_size:]
+            rise_flags = [any(rule(s) for rule in rise_rules) for s in rest]
+            if any(rise_flags):
+                risen = [s for s, flag in zip(rest, rise_flags) if flag]
+                stories = window + risen + [s for s, flag in zip(rest, rise_flags) if not flag]
+
+        if not self.sink_rules:
+            return stories
+
+        # stories in window, sunk stories (right after window), remaining stories
+        window, sunk, remaining = [], [], []
+        sink_rules = self.sink_rules
+        for story in stories:
+            if len(window) >= self.window_size:
+                remaining.append(story)
+            elif any(rule(story) for rule in sink_rules):
+                sunk.append(story)
+            else:
+                window.append(story)
+
+        return window + sunk + remaining
+
+
+def job_hiring_rule(story):
+    title = story.get('title', '')
+    return not (title and JOB_TITLE_RE.search(title))
+
+
+def preorder_rule(preorder_ids):
+    '''Stories in preorder list come first with given order.'''
+    orders = {}
+    for index, id in enumerate(preorder_ids):
+        orders.setdefault(id, index)
+    default_order = len(orders)
+    return lambda s: orders.get(s.get('id', 0), default_order)
+
+
+def high_priority_rise_rule(high_ids):
+    '''High priority stories behind article window are moved to the window boundary.'''
+    high_ids = set(high_ids)
+    return lambda s: s.get('id', 0) in high_ids
+
+
+def score_rule(story):
+    return -story.get('score', 0)
+
+
+def low_priority_sink_rule(low_ids, preorder_ids, high_ids=()):
+    '''Low priority stories are kept out of article window, high priority wins if a story is in both lists.'''
+    sink_ids = set(low_ids) - set(preorder_ids) - set(high_ids)
+    return lambda s: s.get('id', 0) in sink_ids
+
+
+def uninterpretable_sink_rule(story):
+    '''不可解读的story'''
+    title = story.get('title', '').strip()
+    url = story.get('url', '').strip()
+
+    is_question = title.startswith('Ask HN:')
+    is_video = title.endswith('[video]')
+    is_pdf = url.endswith('.pdf') or url.startswith('https://arxiv.org/pdf/')
+
+    return is_question or is_pdf or is_video
+
+
+def benchmark_ranking_engine(story_count=10000, repeat=5):
+    '''Compare ranking engine with a frozen copy of the legacy multi-pass ranking of HackernewsClient.'''
+    from geeknews.hackernews.config import HackernewsConfig
+    from geeknews.hackernews.data_path import HackernewsDataPathManager
+    from geeknews.hackernews.api_client import HackernewsClient, HN_RECENT_HOURS
+
+    config = HackernewsConfig.get_from_parser()
+    config.rank_mode = 'score'
+    client = HackernewsClient(config, HackernewsDataPathManager(config))
+    window_size = config.daily_article_max_count
+
+    now = int(time.time())
+    titles = ['Show HN: Something', 'Ask HN: Question', 'A talk [video]', 'Acme (YC S21) Is Hiring', 'Plain story']
+    stories = []
+    for i in range(story_count):
+        stories.append({
+            'id': i,
+            'title': random.choice(titles),
+            'url': random.choice(['https://example.com/a', 'https://example.com/b.pdf']),
+            'score': random.randint(0, 1000),
+            'time': now - random.randint(0, 3600 * 48),
+        })
+    rule_content = {
+        'priority': {
+            'high': random.sample(range(story_count), 50),
+            'low': random.sample(range(story_count), 50),
+        },
+        'preorder': random.sample(range(story_count), 20),
+    }
+
+    # legacy: filter, sort by score, move high up, move low down, preorder, move uninterpretable down
+    def move_elements_down(arr, index, condition):
+        if index >= len(arr) or index < 0:
+            return arr
+        elements_to_move = [arr[i] for i in range(len(arr)) if i < index and condition(arr[i])]
+        arr = [arr[i] for i in range(len(arr)) if i >= index or not condition(arr[i])]
+        arr[index:] = elements_to_move + arr[index:]
+        return arr
+
+    def move_elements_up(arr, index, condition):
+        if index < 0 or index >= len(arr):
+            return arr
+        elements_to_move = [arr[i] for i in range(len(arr)) if i > index and condition(arr[i])]
+        arr = [arr[i] for i in range(len(arr)) if i <= index or not condition(arr[i])]
+        arr[:index] = arr[:index] + elements_to_move
+        return arr
+
+    def run_legacy():
+        high_ids = set(rule_content['priority']['high'])
+        low_ids = set(rule_content['priority']['low'])
+        result = []
+        for story in stories:
+            story = dict(story)
+            if story['id'] in high_ids:
+                story['priority'] = 'high'
+            elif story['id'] in low_ids:
+                story['priority'] = 'low'
+            if 0 <= now - story['time'] < 3600 * HN_RECENT_HOURS and job_hiring_rule(story):
+                result.append(story)
+        result.sort(key=lambda s: s.get('score', 0), reverse=True)
+        result = move_elements_up(result, window_size, lambda s: s.get('priority', '') == 'high')
+        result = move_elements_down(result, window_size, lambda s: s.get('priority', '') == 'low')
+
+        preorder_ids = [id for id in rule_content['preorder'] if id in {s['id'] for s in result}]
+        preorder_stories = {s['id']: s for s in result if s['id'] in set(preorder_ids)}
+        result = [preorder_stories[id] for id in preorder_ids] + [s for s in result if s['id'] not in preorder_stories]
+        return move_elements_down(result, window_size, uninterpretable_sink_rule)
+
+    def run_engine():
+        engine = client.create_ranking_engine(rule_content, priority=True)
+        return engine.rank(list(stories))
+
+    for name, func in [('legacy', run_legacy), ('engine', run_engine)]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - start) / repeat
+        LOG.info(f'{name}: {story_count} stories, {elapsed*1000:.1f} ms/run')
+
+    # windows differ when legacy single-shot sinks move sunk stories back into the window, see create_ranking_engine
+    legacy_window = [s['id'] for s in run_legacy()[:window_size]]
+    engine_window = [s['id'] for s in run_engine()[:window_size]]
+    LOG.info(f'文章窗口与legacy相同: {legacy_window == engine_window}')
@@ -0,0 +1,241 @@
+import re
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from geeknews.llm import LLM
+from geeknews.utils import codec
+from geeknews.utils.logger import LOG
+from geeknews.hackernews.config import HackernewsConfig
+from geeknews.hackernews.relevance_filter import HackernewsRelevanceFilter
+
+
+@dataclass(slots=True)
+class HackernewsRelevanceItem:
+    id: object
+    title: str
+    content: str
+
+
+class HackernewsRelevanceChecker:
+    '''
+    Score relevance of title and content (0-100) of short pages by llm.
+    - clear pages are scored locally by HackernewsRelevanceFilter (relevance_prefilter), only ambiguous pages are sent to llm.
+    - many pages are packed into one request (relevance_batch_size), which returns a score per id.
+    - pages which are missing in the batch reply (or if reply can not be parsed) are checked one by one.
+    - aio_check_score collects concurrent checks for relevance_batch_wait_ms, so the pipeline is batched too.
+      a batch is sent at once when all concurrent checkers are waiting (see aio_scope), instead of waiting for the timer.
+    '''
+
+    def __init__(self, llm: LLM, config: HackernewsConfig):
+        self.llm = llm
+        self.config = config
+        self.score_re = re.compile(r'-?\d+')
+        self.filter = HackernewsRelevanceFilter(config)
+        self.pending = []
+        self.flush_handle = None
+        self.flush_tasks = set()
+        self.concurrency = 0
+
+    @property
+    def batch_size(self):
+        '''relevance_batch_size, but not more than count of concurrent checkers, or a batch can never be full.'''
+        batch_size = max(self.config.relevance_batch_size, 1)
+        if self.concurrency > 0:
+            return min(batch_size, self.concurrency)
+        return batch_size
+
+    def format_item(self, item: HackernewsRelevanceItem):
+        return f"<title>{item.title}</title>\n<content>\n{item.content}\n</content>"
+
+    def format_batch(self, items):
+        '''Pages are numbered in batch, number is the id in prompt.'''
+        pages = []
+        for index, item in enumerate(items, 1):
+            pages.append(f'<page id="{index}">\n{self.format_item(item)}\n</page>')
+        return '\n'.join(pages)
+
+    def parse_score(self, result):
+        if not result:
+            return 0
+        score_match = self.score_re.search(result)
+        if not score_match:
+            return 0
+        try:
+            return int(score_match.group())
+        except Exception as e:
+            LOG.error(f"文章内容相关性评分解析失败: {e}")
+            return 0
+
+    def parse_batch_scores(self, result, items):
+        '''Return {item id: score} of items found in reply.'''
+        if not result or '{' not in result:
+            return {}
+        try:
+            data = codec.loads(result[result.index('{'):result.rindex('}') + 1])
+        except Exception as e:
+            LOG.error(f"批量相关性评分解析失败: {e}")
+            return {}
+        if not isinstance(data, dict):
+            return {}
+
+        scores = {}
+        for index, item in enumerate(items, 1):
+            value = data.get(str(index))
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                scores[item.id] = min(max(int(value), 0), 100)
+        return scores
+
+    def prefilter(self, items):
+        '''Return {item id: score} of pages decided locally, and ambiguous items.'''
+        scores, ambiguous_items = {}, []
+        for item, score in zip(items, self.filter.classify(items)):
+            if score is None:
+                ambiguous_items.append(item)
+            else:
+                scores[item.id] = score
+        if scores:
+            LOG.debug(f'本地相关性评分: {len(scores)}/{len(items)}篇, 其余由llm评分')
+        return scores, ambiguous_items
+
+    def split_batches(self, items):
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+    # =======
+    # sync
+    # =======
+
+    def check_score(self, title, content):
+        '''Check title and content relevance and return a score of 0-100.'''
+        scores, ambiguous_items = self.prefilter([HackernewsRelevanceItem(None, title, content)])
+        if not ambiguous_items:
+            return scores[None]
+        return self.check_single_score(title, content)
+
+    def check_single_score(self, title, content):
+        result = self.llm.get_gemini_text(
+            system_prompt=LLM.get_system_prompt('check_article_relevance', subdir='hackernews'),
+            user_content=self.format_item(HackernewsRelevanceItem(None, title, content)),
+            model=None,
+        )
+        return self.parse_score(result)
+
+    def check_scores(self, items):
+        '''Return {id: score} of (id, title, content) items.'''
+        scores, items = self.prefilter([HackernewsRelevanceItem(*item) for item in items])
+        for batch in self.split_batches(items):
+            batch_scores = self.check_batch_scores(batch)
+            for item in batch:
+                if item.id not in batch_scores:
+                    batch_scores[item.id] = self.check_single_score(item.title, item.content)
+            scores.update(batch_scores)
+        return scores
+
+    def check_batch_scores(self, batch):
+        if len(batch) == 1:
+            return {}
+        result = self.llm.get_gemini_text(
+            system_prompt=LLM.get_system_prompt('check_article_relevance_batch', subdir='hackernews'),
+            user_content=self.format_batch(batch),
+            model=None,
+        )
+        return self.log_batch_scores(batch, self.parse_batch_scores(result, batch))
+
+    def log_batch_scores(self, batch, scores):
+        if len(scores) < len(batch):
+            LOG.error(f'批量相关性评分缺少{len(batch) - len(scores)}/{len(batch)}篇, 逐篇评分')
+        else:
+            LOG.debug(f'批量相关性评分完成: {len(batch)}篇')
+        return scores
+
+    # =======
+    # aio
+    # =======
+
+    @asynccontextmanager
+    async def aio_scope(self, concurrency=0):
+        '''
+        Batching state of current event loop, timer and futures of a finished loop are never reused.
+        concurrency: max count of concurrent aio_check_score calls (e.g. relevance workers of pipeline), 0 if not limited.
+        '''
+        self.reset_batching(concurrency)
+        try:
+            yield self
+        finally:
+            for _, future in self.pending:
+                future.cancel()
+            if self.flush_tasks:
+                await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+            self.reset_batching()
+
+    def reset_batching(self, concurrency=0):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        self.pending = []
+        self.flush_handle = None
+        self.flush_tasks = set()
+        self.concurrency = concurrency
+
+    async def aio_check_single_score(self, title, content):
+        result = await self.llm.aio_get_gemini_text(
+            system_prompt=LLM.get_system_prompt('check_article_relevance', subdir='hackernews'),
+            user_content=self.format_item(HackernewsRelevanceItem(None, title, content)),
+        )
+        return self.parse_score(result)
+
+    async def aio_check_scores(self, items):
+        '''Return {id: score} of (id, title, content) items, batches are requested concurrently.'''
+        scores, items = self.prefilter([HackernewsRelevanceItem(*item) for item in items])
+        for batch_scores in await asyncio.gather(*[self.aio_check_batch(batch) for batch in self.split_batches(items)]):
+            scores.update(batch_scores)
+        return scores
+
+    async def aio_check_batch(self, batch):
+        scores = {}
+        if len(batch) > 1:
+            result = await self.llm.aio_get_gemini_text(
+                system_prompt=LLM.get_system_prompt('check_article_relevance_batch', subdir='hackernews'),
+                user_content=self.format_batch(batch),
+            )
+            scores = self.log_batch_scores(batch, self.parse_batch_scores(result, batch))
+
+        missing_items = [item for item in batch if item.id not in scores]
+        missing_scores = await asyncio.gather(*[self.aio_check_single_score(item.title, item.content) for item in missing_items])
+        for item, score in zip(missing_items, missing_scores):
+            scores[item.id] = score
+        return scores
+
+    async def aio_check_score(self, item_id, title, content):
+        '''Check score of one page, concurrent checks are batched into one request.'''
+        scores, ambiguous_items = self.prefilter([HackernewsRelevanceItem(item_id, title, content)])
+        if not ambiguous_items:
+            return scores[item_id]
+        if self.batch_size == 1:
+            return await self.aio_check_single_score(title, content)
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((HackernewsRelevanceItem(item_id, title, content), future))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.config.relevance_batch_wait_ms / 1000, self.flush)
+        return await future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self.aio_resolve_batch(batch))
+            self.flush_tasks.add(task)
+            task.add_done_callback(self.flush_tasks.discard)
+
+    async def aio_resolve_batch(self, batch):
+        try:
+            scores = await self.aio_check_batch([item for item, _ in batch])
+        except Exception as e:
+            LOG.error(f'批量相关性评分出错: {e}')
+            scores = {}
+        for item, future in batch:
+            if not future.done():
+                future.set_result(scores.get(item.id, 0))
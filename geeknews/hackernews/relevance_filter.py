@@ -0,0 +1,116 @@
+import re
+from itertools import chain
+import numpy as np
+from geeknews.hackernews.config import HackernewsConfig
+
+
+# pages which are not the article: bot challenges, login / paywalls, error templates (matched against lowercase content)
+BLOCKED_PAGE_RE = re.compile('|'.join([
+    r'enable (?:javascript|js|cookies)',
+    r'javascript is (?:disabled|required|not enabled)',
+    r'(?:checking|verifying) (?:if the site connection is secure|your browser)',
+    r'just a moment\.\.\.',
+    r'attention required',
+    r'cloudflare ray id',
+    r'verify (?:that )?you are (?:a )?human',
+    r'are you a robot',
+    r'unusual traffic',
+    r'captcha',
+    r'access (?:is )?denied',
+    r'403 forbidden',
+    r'404 (?:not found|error)',
+    r'page (?:was )?not found',
+    r'(?:page|file) (?:you (?:requested|are looking for) )?(?:could not|cannot|can\'t|doesn\'t|does not) (?:be found|exist)',
+    r'(?:sign|log) ?in to (?:continue|read|view)',
+    r'please (?:sign|log) ?in',
+    r'create (?:a )?(?:free )?account to (?:continue|read)',
+    r'subscribe (?:now )?to (?:continue|keep) reading',
+    r'this content is (?:only )?available (?:to|for) subscribers',
+    r'(?:unsupported|update your) browser',
+    r'too many requests',
+    r'service (?:is )?(?:temporarily )?unavailable',
+    r'under maintenance',
+    r'domain (?:is )?for sale',
+]))
+# terms of at least 2 letters or digits
+TERM_RE = re.compile(r'[^\W_]{2,}')
+URL_RE = re.compile(r'https?://\S+|www\.\S+|\]\([^)]*\)')
+STOP_WORDS = frozenset(['the', 'and', 'for', 'with', 'from', 'that', 'this', 'how', 'why', 'what', 'you', 'your', 'are', 'was', 'has', 'have', 'not', 'but', 'its', 'into', 'about', 'show', 'ask'])
+
+# content with fewer words is not an article
+MIN_WORD_COUNT = 5
+# content with fewer words is never accepted locally
+ACCEPT_WORD_COUNT = 20
+# content with more links / urls per word is a link list
+MAX_URL_RATIO = 0.5
+
+
+class HackernewsRelevanceFilter:
+    '''
+    Local relevance check of short pages before asking llm, features are computed as numpy arrays of the whole batch.
+    Terms are only split per page, title overlap and new terms are counted on flat (page, term) arrays without python loops.
+    - reject: too few words, mostly urls, a copy of title, or a blocked page (login / error / bot challenge) which does not match title.
+    - accept: enough words, no blocked page pattern and most title terms appear in content.
+    - others are ambiguous (None), and checked by llm.
+    '''
+
+    ACCEPT_SCORE = 100
+    REJECT_SCORE = 0
+
+    def __init__(self, config: HackernewsConfig):
+        self.config = config
+
+    @property
+    def enabled(self):
+        return self.config.relevance_prefilter
+
+    @staticmethod
+    def get_terms(text):
+        '''Terms of lowercase text.'''
+        return set(TERM_RE.findall(text)) - STOP_WORDS
+
+    @staticmethod
+    def flatten_terms(term_sets):
+        '''Return hash of every term, page index of every term and term count of every page.'''
+        term_sets = list(term_sets)
+        counts = np.fromiter(map(len, term_sets), dtype=np.int64, count=len(term_sets))
+        hashes = np.fromiter(map(hash, chain.from_iterable(term_sets)), dtype=np.int64, count=int(counts.sum()))
+        rows = np.repeat(np.arange(len(term_sets)), counts)
+        return hashes, rows, counts
+
+    def load_arrays(self, items):
+        '''Return word count, url ratio, blocked pattern hits, title overlap and new terms of content.'''
+        count = len(items)
+        contents = [item.content.lower() for item in items]
+        words = np.fromiter((len(content.split()) for content in contents), dtype=np.float64, count=count)
+        urls = np.fromiter((len(URL_RE.findall(item.content)) for item in items), dtype=np.float64, count=count)
+        blocked = np.fromiter((BLOCKED_PAGE_RE.search(content) is not None for content in contents), dtype=bool, count=count)
+
+        # (page, term) pairs of titles and contents as int64 keys, term ids are shared by titles and contents
+        title_hashes, title_rows, title_counts = self.flatten_terms(self.get_terms(item.title.lower()) for item in items)
+        content_hashes, content_rows, content_counts = self.flatten_terms(map(self.get_terms, contents))
+        _, term_ids = np.unique(np.concatenate([title_hashes, content_hashes]), return_inverse=True)
+        term_count = int(term_ids.max()) + 1 if term_ids.size else 1
+        title_keys = title_rows * term_count + term_ids[:title_hashes.size]
+        content_keys = content_rows * term_count + term_ids[title_hashes.size:]
+
+        # content terms which are also in its own title
+        shared_counts = np.bincount(content_rows[np.isin(content_keys, title_keys)], minlength=count)
+        overlap = shared_counts / np.maximum(title_counts, 1)
+        # terms of content which are not in its own title, 0 if content is a copy of title
+        new_terms = (content_counts - shared_counts).astype(np.float64)
+        return words, urls / np.maximum(words, 1), blocked, overlap, new_terms
+
+    def classify(self, items):
+        '''Return score of each item, or None if it is ambiguous.'''
+        if not items:
+            return []
+        if not self.enabled:
+            return [None] * len(items)
+
+        words, url_ratio, blocked, overlap, new_terms = self.load_arrays(items)
+        matched = overlap >= self.config.relevance_accept_overlap
+        reject = (words < MIN_WORD_COUNT) | (url_ratio > MAX_URL_RATIO) | (new_terms == 0) | (blocked & ~matched)
+        accept = ~reject & ~blocked & matched & (words >= ACCEPT_WORD_COUNT)
+        decisions = np.where(reject, self.REJECT_SCORE, np.where(accept, self.ACCEPT_SCORE, -1))
+        return [None if d < 0 else int(d) for d in decisions.tolist()]
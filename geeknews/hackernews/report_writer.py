@@ -1,10 +1,12 @@
-import os, re, json
+import os, re
 import mistune
 from geeknews.utils.logger import LOG
 from geeknews.utils.date import GeeknewsDate
+from geeknews.utils import codec
 from geeknews.utils.md2html import MarkdownRenderer
 from geeknews.hackernews.config import HackernewsConfig
 from geeknews.hackernews.data_path import HackernewsDataPathManager
+from geeknews.hackernews.daily_edition import HackernewsDailyEdition
 
 LOCALIZED_TITLE = {
     'zh_cn': '极客浣熊',
@@ -27,6 +29,7 @@ class HackernewsReportWriter:
             locale='zh_cn', 
             date=GeeknewsDate.now(), 
             override=False, 
+            edition: HackernewsDailyEdition = None,
         ):
         if report_type == 'web':
             self.generate_report(
@@ -34,7 +37,8 @@ class HackernewsReportWriter:
                 locale=locale, 
                 date=date, 
                 override=override, 
-                extract_links=False
+                extract_links=False,
+                edition=edition,
             )
         elif report_type == 'wpp':
             self.generate_report(
@@ -47,6 +51,7 @@ class HackernewsReportWriter:
                 html_suffix_name='.wpp', 
                 css_inline=True,
                 remove_h1=False,
+                edition=edition,
                 compact=True, # 微信公众号需要在网页里去除换行符，否则会在草稿编辑器里生成多余的br标签
             )
 
@@ -62,10 +67,12 @@ class HackernewsReportWriter:
             css_inline=False,
             remove_h1=False,
             compact=False,
+            edition: HackernewsDailyEdition = None,
         ):
         '''
         Combine today's summaries to daily report.
         If extrack_links=True, then extract embeded links to bottom.
+        If edition is given, stories and summaries are taken from memory instead of disk.
         '''
         report_path = self.datapath_manager.get_report_file_path(locale=locale, date=date, ext=md_suffix_name+'.md')
         if not override and os.path.exists(report_path):
@@ -74,50 +81,49 @@ class HackernewsReportWriter:
         headlines = ['#### 极客摘要']
         report_contents = []
 
-        story_path = self.datapath_manager.get_stories_file_path(category, date)
-        if not os.path.exists(story_path):
-            LOG.error(f'无法生成报告, 未找到 {story_path}')
-            return
+        if edition and category == 'topstories':
+            stories = edition.stories
+        else:
+            story_path = self.datapath_manager.get_stories_file_path(category, date)
+            if not os.path.exists(story_path):
+                LOG.error(f'无法生成报告, 未找到 {story_path}')
+                return
 
-        with open(story_path) as f:
-            stories = json.load(f)
+            with open(story_path) as f:
+                stories = codec.load(f)
 
         for story in stories:
             article = story.get('article', False)
             if not article:
                 continue
             story_id = story.get('id', 0)
-            sum_path = self.datapath_manager.get_summary_file_path(story_id, locale, date)
-            if not os.path.exists(sum_path):
+            sum_content = self.read_summary(story_id, locale, date, edition)
+            if sum_content is None:
                 LOG.error(f'未找到生成的总结: {story_id}')
                 continue
-            with open(sum_path) as f:
-                sum_content = f.read().strip()
-                first_line_end = sum_content.find('\n')
-                if first_line_end > 0:
-                    headline = sum_content[:first_line_end]
-                    if headline.startswith('# '):
-                        headline = '- ' + headline[2:]
-                    headlines.append(headline)
-                if extract_links:
-                    sum_content = self.re_link.sub(self.get_link_number, sum_content)
-                report_contents.append('###' + sum_content)
-                report_contents.append('')
+            sum_content = sum_content.strip()
+            first_line_end = sum_content.find('\n')
+            if first_line_end > 0:
+                headline = sum_content[:first_line_end]
+                if headline.startswith('# '):
+                    headline = '- ' + headline[2:]
+                headlines.append(headline)
+            if extract_links:
+                sum_content = self.re_link.sub(self.get_link_number, sum_content)
+            report_contents.append('###' + sum_content)
+            report_contents.append('')
 
         if len(headlines) > 1:
             headlines.append('')
             report_contents = headlines + report_contents
 
-        sum_dir = self.datapath_manager.get_summary_full_dir(locale, date)
-        short_story_path = os.path.join(sum_dir, 'short_stories.md')
-        if os.path.exists(short_story_path):
-            with open(short_story_path) as f:
-                story_list_content = f.read()
-                if extract_links:
-                    story_list_content = self.re_link.sub(self.get_link_number, story_list_content)
-                report_contents.append('#### ' + self.get_other_topics_title(locale))
-                report_contents.append(story_list_content)
-                report_contents.append('')
+        story_list_content = self.read_story_list_summary('short_stories', locale, date, edition)
+        if story_list_content is not None:
+            if extract_links:
+                story_list_content = self.re_link.sub(self.get_link_number, story_list_content)
+            report_contents.append('#### ' + self.get_other_topics_title(locale))
+            report_contents.append(story_list_content)
+            report_contents.append('')
 
         if len(report_contents) <= 2:
             LOG.error(f'没有足够的信息生成报告')
@@ -168,6 +174,27 @@ class HackernewsReportWriter:
         
         LOG.debug(f"完成报告生成: {report_path}")
 
+    def read_summary(self, story_id, locale='zh_cn', date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        '''Return summary content, or None if not found.'''
+        if edition and story_id in edition.get_summaries(locale):
+            return edition.get_summaries(locale)[story_id]
+        sum_path = self.datapath_manager.get_summary_file_path(story_id, locale, date)
+        if not os.path.exists(sum_path):
+            return None
+        with open(sum_path) as f:
+            return f.read()
+
+    def read_story_list_summary(self, name, locale='zh_cn', date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        '''Return translated story list content, or None if not found.'''
+        if edition and name in edition.get_story_list_summaries(locale):
+            return edition.get_story_list_summaries(locale)[name]
+        sum_dir = self.datapath_manager.get_summary_full_dir(locale, date)
+        story_list_path = os.path.join(sum_dir, name + '.md')
+        if not os.path.exists(story_list_path):
+            return None
+        with open(story_list_path) as f:
+            return f.read()
+
     def get_title(self, locale):
         if locale == 'zh_cn':
             return ""
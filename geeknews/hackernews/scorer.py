@@ -0,0 +1,45 @@
+import time
+import numpy as np
+from geeknews.hackernews.config import HackernewsConfig
+
+
+class HackernewsStoryScorer:
+    '''
+    Vectorized story scoring with numpy.
+    gravity score = (points - 1 + comment_weight * descendants) / (age_hours + 2) ^ gravity
+    '''
+
+    def __init__(self, config: HackernewsConfig):
+        self.config = config
+
+    @staticmethod
+    def load_arrays(stories):
+        '''Load score, time, descendants of stories into numpy arrays.'''
+        count = len(stories)
+        scores = np.fromiter((s.get('score', 0) or 0 for s in stories), dtype=np.float64, count=count)
+        times = np.fromiter((s.get('time', 0) or 0 for s in stories), dtype=np.float64, count=count)
+        descendants = np.fromiter((s.get('descendants', 0) or 0 for s in stories), dtype=np.float64, count=count)
+        return scores, times, descendants
+
+    def gravity_scores(self, stories, now=None):
+        now = time.time() if now is None else now
+        scores, times, descendants = self.load_arrays(stories)
+        age_hours = np.maximum(now - times, 0) / 3600
+        points = np.maximum(scores - 1, 0) + self.config.rank_comment_weight * descendants
+        return points / np.power(age_hours + 2, self.config.rank_gravity)
+
+    def recent_mask(self, stories, in_hours, now=None):
+        now = time.time() if now is None else now
+        times = np.fromiter((s.get('time', 0) or 0 for s in stories), dtype=np.float64, count=len(stories))
+        age = now - times
+        return (age >= 0) & (age < 3600 * in_hours)
+
+    def recent_rule(self, in_hours):
+        '''Batch filter rule for ranking engine.'''
+        now = time.time()
+        return lambda stories: self.recent_mask(stories, in_hours, now)
+
+    def gravity_rule(self):
+        '''Batch key rule for ranking engine, higher gravity score ranks higher.'''
+        now = time.time()
+        return lambda stories: (-self.gravity_scores(stories, now)).tolist()
@@ -0,0 +1,229 @@
+import time
+import threading
+import requests
+from geeknews.utils.logger import LOG
+from geeknews.utils import codec
+from geeknews.hackernews.config import HackernewsConfig
+from geeknews.hackernews.api_client import HackernewsClient
+
+
+class HackernewsSubscriber:
+    '''
+    Track topstories continuously in background thread, keep an in-memory ranked view
+    and write fetched items through to the global item cache, so that scheduled jobs start from warm data.
+
+    Mode "stream" uses firebase REST streaming (server-sent events), and falls back to polling if stream is broken.
+    Mode "poll" polls topstories.json with adaptive interval (longer when nothing changed).
+    '''
+
+    def __init__(self, config: HackernewsConfig, api_client: HackernewsClient):
+        self.config = config
+        self.api_client = api_client
+        self.top_story_ids = []
+        # ids of stream with None placeholders, so indices of later patches stay valid
+        self.stream_ids = []
+        self.stories = {}
+        self.updated_at = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='hn-subscriber', daemon=True)
+        self.thread.start()
+        if not self.api_client.item_cache.enabled:
+            LOG.warning('[订阅]item_cache_ttl_minutes为0, 无法预热数据')
+        LOG.info(f'[订阅]开始跟踪topstories, 模式: {self.config.live_subscribe_mode}')
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.thread = None
+
+    def get_top_story_ids(self):
+        '''Return ranked ids if the view is not outdated, else empty list.'''
+        with self.lock:
+            max_age = self.config.live_poll_max_seconds * 2
+            if not self.top_story_ids or time.time() - self.updated_at > max_age:
+                return []
+            return list(self.top_story_ids)
+
+    def get_ranked_stories(self):
+        with self.lock:
+            return [self.stories[id] for id in self.top_story_ids if id in self.stories]
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.config.live_subscribe_mode == 'stream':
+                try:
+                    self.stream()
+                except Exception as e:
+                    LOG.error(f'[订阅]stream中断: {e}')
+                # keep data warm by polling for a while before reconnecting stream
+                self.poll(max_rounds=3)
+            else:
+                self.poll()
+
+    def stream(self):
+        url = self.api_client.api.top_stories_url()
+        headers = {'Accept': 'text/event-stream'}
+        # firebase sends keep-alive event every 30 seconds
+        timeout = (self.config.story_fetch_connect_timeout, 90)
+
+        with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            event = ''
+            # small chunk size, otherwise events are buffered until enough bytes arrive
+            for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+                if self.stop_event.is_set():
+                    return
+                if line is None:
+                    continue
+                if line.startswith('event:'):
+                    event = line[6:].strip()
+                elif line.startswith('data:'):
+                    self.on_stream_event(event, line[5:].strip())
+                    event = ''
+
+    def on_stream_event(self, event, data_text):
+        if event in ('cancel', 'auth_revoked'):
+            raise RuntimeError(f'stream {event}')
+        if event not in ('put', 'patch'):
+            return
+
+        data = codec.loads(data_text)
+        path = data.get('path', '/')
+        value = data.get('data')
+        ids = list(self.stream_ids)
+
+        if path == '/' and event == 'put':
+            ids = value if isinstance(value, list) else []
+        elif path == '/' and event == 'patch' and isinstance(value, dict):
+            for index, id in value.items():
+                ids = self.set_index(ids, int(index), id)
+        elif path.lstrip('/').isdigit():
+            ids = self.set_index(ids, int(path.lstrip('/')), value)
+
+        self.stream_ids = ids
+        self.on_top_story_ids(ids)
+
+    @staticmethod
+    def set_index(ids, index, id):
+        if index >= len(ids):
+            ids = ids + [None] * (index + 1 - len(ids))
+        ids[index] = id
+        return ids
+
+    def poll(self, max_rounds=None):
+        interval = self.config.live_poll_min_seconds
+        rounds = 0
+
+        while not self.stop_event.is_set():
+            # request HN directly, fetch_top_story_ids of api client returns the view of subscriber
+            ids = self.api_client.http_get(self.api_client.api.top_stories_url(), empty_data=[])
+            changed = bool(ids) and ids != self.top_story_ids
+            if ids:
+                self.on_top_story_ids(ids)
+
+            if changed:
+                interval = self.config.live_poll_min_seconds
+            else:
+                interval = min(interval * 2, self.config.live_poll_max_seconds)
+
+            rounds += 1
+            if max_rounds and rounds >= max_rounds:
+                return
+            self.stop_event.wait(interval)
+
+    def on_top_story_ids(self, ids):
+        # compact placeholders of stream
+        ids = [id for id in ids if isinstance(id, int)]
+        if not ids:
+            return
+
+        # write-through: download items which are not fresh in cache
+        watch_ids = ids[:self.config.story_rank_max_count]
+        item_cache = self.api_client.item_cache
+        fresh_items = item_cache.get_fresh_items(watch_ids)
+        download_ids = [id for id in watch_ids if id not in fresh_items]
+        downloaded_items = {}
+        for id in download_ids:
+            if self.stop_event.is_set():
+                break
+            downloaded_items[id] = self.api_client.fetch_item(id)
+        fresh_items.update(item_cache.refresh(downloaded_items))
+
+        with self.lock:
+            self.top_story_ids = ids
+            self.stories = fresh_items
+            self.updated_at = time.time()
+
+        if download_ids:
+            LOG.debug(f'[订阅]topstories已更新, 下载{len(download_ids)}个')
+
+
+def test_hackernews_subscriber():
+    '''Run subscriber against a local stand-in of HN: stream put / patch events, then poll topstories.'''
+    import tempfile
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    from geeknews.hackernews.data_path import HackernewsDataPathManager
+
+    events = [
+        ('put', {'path': '/', 'data': [1, 2, 3, 4]}),
+        # index 1 is removed, later patches still use indices of the stream
+        ('patch', {'path': '/', 'data': {'1': None, '3': 5}}),
+        ('put', {'path': '/2', 'data': 6}),
+    ]
+    poll_ids = [7, 8]
+    requests_count = {'topstories': 0}
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith('/v0/topstories.json') and 'text/event-stream' in self.headers.get('Accept', ''):
+                body = ''.join(f'event: {event}\ndata: {codec.dumps(data)}\n\n' for event, data in events)
+                content_type = 'text/event-stream'
+            elif self.path.startswith('/v0/topstories.json'):
+                requests_count['topstories'] += 1
+                body, content_type = codec.dumps(poll_ids), 'application/json'
+            else:
+                id = int(self.path.split('/')[-1].split('.')[0])
+                body = codec.dumps({'id': id, 'type': 'story', 'title': f'story {id}', 'score': id, 'time': int(time.time())})
+                content_type = 'application/json'
+            body = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    config = HackernewsConfig.get_from_parser()
+    config.story_dir = tempfile.mkdtemp()
+    config.live_poll_min_seconds = 0
+    client = HackernewsClient(config, HackernewsDataPathManager(config))
+    client.api.base_url = f'http://127.0.0.1:{server.server_address[1]}/v0'
+    subscriber = HackernewsSubscriber(config, client)
+    client.subscriber = subscriber
+
+    try:
+        subscriber.stream()
+        assert subscriber.top_story_ids == [1, 6, 5], subscriber.top_story_ids
+        assert client.fetch_top_story_ids() == [1, 6, 5]
+        assert [story['id'] for story in subscriber.get_ranked_stories()] == [1, 6, 5]
+
+        # poll requests HN every round, even if the view of subscriber is fresh
+        subscriber.poll(max_rounds=2)
+        assert requests_count['topstories'] == 2, requests_count
+        assert subscriber.top_story_ids == poll_ids
+        LOG.info('[订阅]测试通过')
+    finally:
+        server.shutdown()
@@ -1,13 +1,15 @@
-import os, re, json
+import os, re
 import asyncio
 import aiofiles
 
 from geeknews.llm import LLM
 from geeknews.utils.logger import LOG
 from geeknews.utils.date import GeeknewsDate
+from geeknews.utils import codec
 from geeknews.hackernews.config import HackernewsConfig
 from geeknews.hackernews.data_path import HackernewsDataPathManager
 from geeknews.hackernews.api_client import HackernewsClient
+from geeknews.hackernews.daily_edition import HackernewsDailyEdition
 
 TRANSLATION_VAR = '\{translate_target_language\}'
 TRANSLATION_LOCALE_TO_LANGUAGE = {
@@ -36,54 +38,71 @@ class HackernewsSummaryWriter:
         self.re_title = re.compile(r'^(#{1,6})\s*(?P<head>.+)\n*')
         self.re_comment_tag = re.compile(r'USER\\?_COMMENTS[:：]\s?\n?') # USER_COMMENTS: , USER\_COMMENTS: , ...
 
-    def generate_daily_summaries(self, locale='zh_cn', date=GeeknewsDate.now(), override=False):
-        article_paths = self.datapath_manager.get_daily_article_paths(date)
-        story_date_dir = self.datapath_manager.get_story_date_dir(date)
-        short_story_path = os.path.join(story_date_dir, 'short_stories.json')
+    def generate_daily_summaries(self, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
+        articles = self.get_daily_articles(date, edition)
+        LOG.debug(f'开始总结以下文章, 数量: {len(articles)}')
+        self.generate_article_summaries(articles, locale, date, override, edition)
+        self.generate_short_story_summary(locale, date, override, edition)
+        LOG.debug(f'总结完成: {self.datapath_manager.get_summary_full_dir(locale, date)}')
 
-        LOG.debug(f'开始总结以下文章, 数量: {len(article_paths)}')
+    async def aio_generate_daily_summaries(self, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
+        articles = self.get_daily_articles(date, edition)
+        LOG.debug(f'开始总结以下文章, 数量: {len(articles)}')
+        await self.aio_generate_article_summaries(articles, locale, date, override, edition)
+        # short story summary uses sync llm client, run it in thread so event loop is not blocked
+        await asyncio.to_thread(self.generate_short_story_summary, locale, date, override, edition)
+        LOG.debug(f'总结完成: {self.datapath_manager.get_summary_full_dir(locale, date)}')
 
-        if self.config.story_fetch_concurrent:
-            asyncio.run(self.aio_generate_article_summaries(article_paths, locale, date, override))
-        else:
-            self.generate_article_summaries(article_paths, locale, date, override)
-        
-        self.generate_story_list_summary(short_story_path, locale, date, override)
+    def get_daily_articles(self, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        '''Return (story id, article content) pairs of edition, or article paths of date.'''
+        if edition:
+            return list(edition.articles.items())
+        return self.datapath_manager.get_daily_article_paths(date)
 
-        LOG.debug(f'总结完成: {self.datapath_manager.get_summary_full_dir(locale, date)}')
+    def generate_short_story_summary(self, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
+        story_date_dir = self.datapath_manager.get_story_date_dir(date)
+        short_story_path = os.path.join(story_date_dir, 'short_stories.json')
+        short_stories = edition.short_stories if edition else None
+        summary_content = self.generate_story_list_summary(short_story_path, locale, date, override, short_stories=short_stories)
+        if edition and summary_content:
+            edition.get_story_list_summaries(locale)['short_stories'] = summary_content
+        return summary_content
 
-    def generate_article_summaries(self, article_paths, locale='zh_cn', date=GeeknewsDate.now(), override=False):
-        for article_path in article_paths:
-            self.generate_article_summary(article_path, locale, date, override)
+    def generate_article_summaries(self, articles, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
+        '''articles: article paths, or (story id, article content) pairs of edition.'''
+        for article in articles:
+            if edition:
+                article_id, article_content = article
+                self.generate_summary(article_id, article_content, locale, date, override, edition)
+            else:
+                self.generate_article_summary(article, locale, date, override)
 
     def generate_article_summary(self, article_path, locale='zh_cn', date=GeeknewsDate.now(), override=False):
         article_filename = os.path.basename(article_path)
         article_id, _ = os.path.splitext(article_filename)
         
-        # Get story (with url, author, score)
-        story = {}
-        story_path = self.datapath_manager.get_story_file_path(article_id, date)
-        if os.path.exists(story_path):
-            with open(story_path) as f:
-                story = json.load(f)
-        
         summary_path = self.datapath_manager.get_summary_file_path(article_id, locale, date)
         if not override and os.path.exists(summary_path):
             return
 
         with open(article_path) as f:
-            article_content = f.read().strip()
+            article_content = f.read()
         
-        language = self.get_translation_language(locale)
-        if language == 'English':
-            system_prompt = self.prompt_map['summary_article_en']
-        elif self.config.summary_with_comments:
-            system_prompt = self.prompt_map['summary_article_with_comments']
-        else:
-            system_prompt = self.prompt_map['summary_article']
+        self.generate_summary(article_id, article_content, locale, date, override=True)
+
+    def generate_summary(self, article_id, article_content, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
+        summary_path = self.datapath_manager.get_summary_file_path(article_id, locale, date)
+        if not override and self.load_summary(article_id, summary_path, locale, edition):
+            return
+
+        story = self.get_story(article_id, date, edition)
+        system_prompt = self.get_summary_prompt(locale)
+        summary_key = self.get_summary_key(article_id, story.get('url', ''), article_content, system_prompt)
+        if self.reuse_indexed_summary(article_id, summary_key, summary_path, locale, edition):
+            return
 
         LOG.debug(f'开始总结文章: {article_id}')
-        summary_content = self.llm.generate_text(system_prompt, article_content, self.config.summary_model)
+        summary_content = self.llm.generate_text(system_prompt, article_content.strip(), self.config.summary_model)
         final_content = self.modify_summarized_content(
             article_id=article_id, 
             article_url=story.get('url', HackernewsClient.get_default_story_url(article_id)), 
@@ -93,44 +112,47 @@ class HackernewsSummaryWriter:
         
         with open(summary_path, 'w') as f:
             f.write(final_content)
+        self.datapath_manager.get_content_index().add_summary(summary_key, locale, summary_path)
+        if edition:
+            edition.get_summaries(locale)[int(article_id)] = final_content
     
-    async def aio_generate_article_summaries(self, article_paths, locale='zh_cn', date=GeeknewsDate.now(), override=False):
+    async def aio_generate_article_summaries(self, articles, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
         tasks = []
-        for article_path in article_paths:
-            task = asyncio.create_task(self.aio_generate_article_summary(article_path, locale, date, override))
-            tasks.append(task)
+        for article in articles:
+            if edition:
+                article_id, article_content = article
+                coro = self.aio_generate_summary(article_id, article_content, locale, date, override, edition)
+            else:
+                coro = self.aio_generate_article_summary(article, locale, date, override)
+            tasks.append(asyncio.create_task(coro))
         await asyncio.gather(*tasks)
 
     async def aio_generate_article_summary(self, article_path, locale='zh_cn', date=GeeknewsDate.now(), override=False):
         article_filename = os.path.basename(article_path)
         article_id, _ = os.path.splitext(article_filename)
         
-        # Get story (with url, author, score)
-        story = {}
-        story_path = self.datapath_manager.get_story_file_path(article_id, date)
-        if os.path.exists(story_path):
-            async with aiofiles.open(story_path) as f:
-                story_text = await f.read()
-                story = json.loads(story_text)
-        
         summary_path = self.datapath_manager.get_summary_file_path(article_id, locale, date)
         if not override and os.path.exists(summary_path):
             return
 
         async with aiofiles.open(article_path) as f:
             article_content = await f.read()
-            article_content = article_content.strip()
         
-        language = self.get_translation_language(locale)
-        if language == 'English':
-            system_prompt = self.prompt_map['summary_article_en']
-        elif self.config.summary_with_comments:
-            system_prompt = self.prompt_map['summary_article_with_comments']
-        else:
-            system_prompt = self.prompt_map['summary_article']
+        await self.aio_generate_summary(article_id, article_content, locale, date, override=True)
+
+    async def aio_generate_summary(self, article_id, article_content, locale='zh_cn', date=GeeknewsDate.now(), override=False, edition: HackernewsDailyEdition = None):
+        summary_path = self.datapath_manager.get_summary_file_path(article_id, locale, date)
+        if not override and self.load_summary(article_id, summary_path, locale, edition):
+            return
+
+        story = self.get_story(article_id, date, edition)
+        system_prompt = self.get_summary_prompt(locale)
+        summary_key = self.get_summary_key(article_id, story.get('url', ''), article_content, system_prompt)
+        if self.reuse_indexed_summary(article_id, summary_key, summary_path, locale, edition):
+            return
 
         LOG.debug(f'开始总结文章: {article_id}')
-        summary_content = await self.llm.aio_generate_text(system_prompt, article_content, self.config.summary_model)
+        summary_content = await self.llm.aio_generate_text(system_prompt, article_content.strip(), self.config.summary_model)
         final_content = self.modify_summarized_content(
             article_id=article_id, 
             article_url=story.get('url', HackernewsClient.get_default_story_url(article_id)), 
@@ -140,9 +162,55 @@ class HackernewsSummaryWriter:
         
         async with aiofiles.open(summary_path, 'w') as f:
             await f.write(final_content)
+        self.datapath_manager.get_content_index().add_summary(summary_key, locale, summary_path)
+        if edition:
+            edition.get_summaries(locale)[int(article_id)] = final_content
+
+    def get_story(self, article_id, date=GeeknewsDate.now(), edition: HackernewsDailyEdition = None):
+        '''Get story (with url, author, score)'''
+        story = edition.get_story(article_id) if edition else {}
+        return story or self.datapath_manager.get_item_store().get(article_id, date)
+
+    def get_summary_prompt(self, locale='zh_cn'):
+        language = self.get_translation_language(locale)
+        if language == 'English':
+            return self.prompt_map['summary_article_en']
+        elif self.config.summary_with_comments:
+            return self.prompt_map['summary_article_with_comments']
+        else:
+            return self.prompt_map['summary_article']
 
-    def generate_story_list_summary(self, story_list_path, locale='zh_cn', date=GeeknewsDate.now(), override=False, preview=False, model=None):
-        if not os.path.exists(story_list_path):
+    def get_summary_key(self, article_id, article_url, article_content, system_prompt):
+        '''Summary depends on story (url and comment link), article content, prompt and model.'''
+        return self.datapath_manager.get_content_index().get_hash(int(article_id), article_url, article_content.strip(), system_prompt, self.config.summary_model)
+
+    def reuse_indexed_summary(self, article_id, summary_key, summary_path, locale='zh_cn', edition: HackernewsDailyEdition = None):
+        '''Copy summary of same content from previous day, so llm is not called again. Return True if reused.'''
+        content_index = self.datapath_manager.get_content_index()
+        indexed_path = content_index.find_summary(summary_key, locale, summary_path)
+        if indexed_path is None:
+            return False
+        final_content = content_index.copy_file(indexed_path, summary_path)
+        if not final_content:
+            return False
+        content_index.add_summary(summary_key, locale, summary_path)
+        LOG.info(f'复用总结: {article_id} <- {indexed_path}')
+        if edition:
+            edition.get_summaries(locale)[int(article_id)] = final_content
+        return True
+
+    def load_summary(self, article_id, summary_path, locale='zh_cn', edition: HackernewsDailyEdition = None):
+        '''Load existing summary into edition, return False if not exists.'''
+        if not os.path.exists(summary_path):
+            return False
+        if edition:
+            with open(summary_path) as f:
+                edition.get_summaries(locale)[int(article_id)] = f.read()
+        return True
+
+    def generate_story_list_summary(self, story_list_path, locale='zh_cn', date=GeeknewsDate.now(), override=False, preview=False, model=None, short_stories=None):
+        '''Translate story list and return the summary content. If short_stories is given, story_list_path is not read.'''
+        if short_stories is None and not os.path.exists(story_list_path):
             return
         
         story_list_filename = os.path.basename(story_list_path)
@@ -151,10 +219,15 @@ class HackernewsSummaryWriter:
         summary_list_path = os.path.join(summary_full_dir, story_list_ori_name + '.md')
         
         if not override and os.path.exists(summary_list_path):
-            return
+            with open(summary_list_path) as f:
+                return f.read()
         
-        with open(story_list_path) as f:
-            short_stories = json.load(f)
+        if short_stories is None:
+            with open(story_list_path) as f:
+                short_stories = codec.load(f)
+        else:
+            # titles are replaced by translation, keep the given stories untouched
+            short_stories = [dict(s) for s in short_stories]
         
         if not short_stories:
             return
@@ -197,30 +270,37 @@ class HackernewsSummaryWriter:
         else:
             summary_contents = list(map(lambda s: f"{bullet_mark}{s['title']} [>>]({s.get('url', '')})", short_stories))
 
+        summary_content = '\n'.join(summary_contents)
         with open(summary_list_path, 'w') as f:
-            f.write('\n'.join(summary_contents))
+            f.write(summary_content)
+        return summary_content
 
     def find_summary_title(self, story_id, locale='zh_cn', date=GeeknewsDate.now()):
         title, _ = self.find_summary_title_and_content(story_id, locale, date)
         return title
     
-    def find_summary_title_and_content(self, story_id, locale='zh_cn', date=GeeknewsDate.now(), limit=None):
-        summary_path = self.datapath_manager.get_summary_file_path(story_id, locale, date)
-        if not os.path.exists(summary_path):
-            return ('', '')
+    def find_summary_title_and_content(self, story_id, locale='zh_cn', date=GeeknewsDate.now(), limit=None, edition: HackernewsDailyEdition = None):
+        summaries = edition.get_summaries(locale) if edition else {}
+        if int(story_id) in summaries:
+            lines = summaries[int(story_id)].splitlines(keepends=True)
+        else:
+            summary_path = self.datapath_manager.get_summary_file_path(story_id, locale, date)
+            if not os.path.exists(summary_path):
+                return ('', '')
+            with open(summary_path) as f:
+                lines = f.readlines()
         
         title, summary = '', ''
-        with open(summary_path) as f:
-            for line in f:
-                if title and summary:
-                    break
-                elif not title and line.startswith('# '):
-                    title = line[2:].strip()
-                elif not summary:
-                    if limit and isinstance(limit, int):
-                        summary = line[:limit]
-                    else:
-                        summary = line.strip()
+        for line in lines:
+            if title and summary:
+                break
+            elif not title and line.startswith('# '):
+                title = line[2:].strip()
+            elif not summary:
+                if limit and isinstance(limit, int):
+                    summary = line[:limit]
+                else:
+                    summary = line.strip()
         
         return title, summary
 
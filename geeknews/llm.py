@@ -1,5 +1,7 @@
 import os
 import httpx
+import asyncio
+from contextlib import contextmanager, asynccontextmanager
 from openai import OpenAI, AsyncOpenAI
 from google import genai
 from google.genai.types import GenerateContentConfig, HttpOptions
@@ -17,6 +19,8 @@ class LLM:
         self.openai_client = self.create_openai_client()
         self.gemini_client = self.create_gemini_client()
         self.aio_openai_client = self.create_aio_openai_client()
+        self.cache = None       # optional LLMCache
+        self.semaphore = None   # optional multiprocessing semaphore, limit concurrent requests across processes
 
     @classmethod
     def get_system_prompt_map(cls, subdir='hackernews'):
@@ -72,6 +76,38 @@ class LLM:
         else:
             return AsyncOpenAI(api_key=api_key)
     
+    def reset_aio_clients(self):
+        '''
+        Async clients are bound to the event loop which first uses them (httpx.AsyncClient pool, asyncio.Lock in genai client),
+        create new ones before running in a new event loop.
+        '''
+        self.aio_openai_client = self.create_aio_openai_client()
+        self.gemini_client = self.create_gemini_client()
+
+    async def aio_close(self):
+        '''Close async connections before current event loop ends.'''
+        try:
+            await self.aio_openai_client.close()
+        except Exception as e:
+            LOG.error(f"关闭openai连接出错: {e}")
+
+        # genai async client has aclose() in newer versions (older versions do not keep connections)
+        aclose = getattr(self.gemini_client.aio, 'aclose', None) if self.gemini_client else None
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception as e:
+                LOG.error(f"关闭gemini连接出错: {e}")
+
+    @asynccontextmanager
+    async def aio_scope(self):
+        '''Create async clients for current event loop, and close them when the scope ends.'''
+        self.reset_aio_clients()
+        try:
+            yield self
+        finally:
+            await self.aio_close()
+
     def create_gemini_client(self):
         gemini_api_key = os.getenv('GEMINI_API_KEY', '')
         if not gemini_api_key:
@@ -137,35 +173,81 @@ class LLM:
             return self.get_assistant_message(system_prompt, user_content)
     
     def get_assistant_message(self, system_prompt, user_content, model=None):
+        model = model if model else self.model
+        cached_content = self.get_cached_content(model, system_prompt, user_content)
+        if cached_content is not None:
+            return cached_content
+
         messages = [
             {'role': 'system', 'content': system_prompt},
             {'role': 'user', 'content': user_content}
         ]
         try:
-            response = self.openai_client.chat.completions.create(
-                model=model if model else self.model,
-                messages=messages
-            )
-            return response.choices[0].message.content
+            with self.limit():
+                response = self.openai_client.chat.completions.create(
+                    model=model,
+                    messages=messages
+                )
+            return self.set_cached_content(model, system_prompt, user_content, response.choices[0].message.content)
         except Exception as e:
             LOG.error(f"请求openai出错: {e}")
             return ''
         
     def get_gemini_text(self, system_prompt, user_content, model):
+        model = model if model else 'gemini-2.0-flash'
+        cached_content = self.get_cached_content(model, system_prompt, user_content)
+        if cached_content is not None:
+            return cached_content
+
         try:
-            response = self.gemini_client.models.generate_content(
-                model=model if model else 'gemini-2.0-flash', 
-                contents=user_content, 
-                config=GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    response_modalities=["TEXT"],
-                ),
-            )
-            return response.text
+            with self.limit():
+                response = self.gemini_client.models.generate_content(
+                    model=model, 
+                    contents=user_content, 
+                    config=GenerateContentConfig(
+                        system_instruction=system_prompt,
+                        response_modalities=["TEXT"],
+                    ),
+                )
+            return self.set_cached_content(model, system_prompt, user_content, response.text)
         except Exception as e:
             LOG.error(f"请求gemini出错: {e}")
             return ''
 
+    def get_cached_content(self, model, system_prompt, user_content):
+        if self.cache is None:
+            return None
+        return self.cache.get(model, system_prompt, user_content)
+
+    def set_cached_content(self, model, system_prompt, user_content, content):
+        if self.cache is not None:
+            self.cache.set(model, system_prompt, user_content, content)
+        return content
+
+    @contextmanager
+    def limit(self):
+        if self.semaphore is None:
+            yield
+            return
+        self.semaphore.acquire()
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+    @asynccontextmanager
+    async def aio_limit(self):
+        if self.semaphore is None:
+            yield
+            return
+        # semaphore is shared by processes, poll it without blocking event loop
+        while not self.semaphore.acquire(block=False):
+            await asyncio.sleep(0.05)
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
     async def aio_generate_text(self, system_prompt, user_content, model):
         if model.startswith('gemini') and self.gemini_client:
             return await self.aio_get_gemini_text(system_prompt, user_content, model)
@@ -173,31 +255,43 @@ class LLM:
             return await self.aio_get_assistant_message(system_prompt, user_content) 
 
     async def aio_get_assistant_message(self, system_prompt, user_content, model=None):
+        model = model if model else self.model
+        cached_content = self.get_cached_content(model, system_prompt, user_content)
+        if cached_content is not None:
+            return cached_content
+
         messages = [
             {'role': 'system', 'content': system_prompt},
             {'role': 'user', 'content': user_content}
         ]
         try:
-            response = await self.aio_openai_client.chat.completions.create(
-                model=model if model else self.model,
-                messages=messages
-            )
-            return response.choices[0].message.content
+            async with self.aio_limit():
+                response = await self.aio_openai_client.chat.completions.create(
+                    model=model,
+                    messages=messages
+                )
+            return self.set_cached_content(model, system_prompt, user_content, response.choices[0].message.content)
         except Exception as e:
             LOG.error(f"请求openai出错: {e}")
             return ''
 
     async def aio_get_gemini_text(self, system_prompt, user_content, model=None):
+        model = model if model else 'gemini-2.0-flash'
+        cached_content = self.get_cached_content(model, system_prompt, user_content)
+        if cached_content is not None:
+            return cached_content
+
         try:
-            response = await self.gemini_client.aio.models.generate_content(
-                model=model if model else 'gemini-2.0-flash',
-                contents=user_content,
-                config=GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    response_modalities=["TEXT"],
-                ),
-            )
-            return response.text
+            async with self.aio_limit():
+                response = await self.gemini_client.aio.models.generate_content(
+                    model=model,
+                    contents=user_content,
+                    config=GenerateContentConfig(
+                        system_instruction=system_prompt,
+                        response_modalities=["TEXT"],
+                    ),
+                )
+            return self.set_cached_content(model, system_prompt, user_content, response.text)
         except Exception as e:
             LOG.error(f"请求gemini出错: {e}")
             return ''
@@ -0,0 +1,64 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from geeknews.utils.logger import LOG
+
+
+class LLMCache:
+    '''
+    Cache of llm responses in SQLite (WAL mode), can be shared by multiple processes.
+    Key is the hash of (model, system prompt, user content), so a changed prompt never hits old responses.
+    '''
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+
+    @property
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+
+        db_dir = os.path.dirname(self.db_path)
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, content TEXT NOT NULL, created_at REAL NOT NULL)')
+        conn.commit()
+
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def get_key(model, system_prompt, user_content):
+        digest = hashlib.sha256()
+        for part in (model or '', system_prompt or '', user_content or ''):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, model, system_prompt, user_content):
+        key = self.get_key(model, system_prompt, user_content)
+        try:
+            row = self.connection.execute('SELECT content FROM responses WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            LOG.error(f'读取llm缓存出错: {e}')
+            return None
+        return row[0] if row else None
+
+    def set(self, model, system_prompt, user_content, content):
+        if not content:
+            return
+        key = self.get_key(model, system_prompt, user_content)
+        try:
+            with self.connection as conn:
+                conn.execute('INSERT OR REPLACE INTO responses (key, model, content, created_at) VALUES (?, ?, ?, ?)', (key, model, content, time.time()))
+        except sqlite3.Error as e:
+            LOG.error(f'写入llm缓存出错: {e}')
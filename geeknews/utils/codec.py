@@ -0,0 +1,46 @@
+import json
+import dataclasses
+
+# https://github.com/ijl/orjson
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson else 'json'
+
+
+def default(obj):
+    '''Encode record types (dataclasses) and sets, which are not supported by stdlib json.'''
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def loads(data):
+    '''Decode json from str or bytes.'''
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent=False) -> str:
+    '''
+    Encode obj to json str, non-ascii characters are kept.
+    Indented json is 4 spaces as existing story files, orjson only supports 2 spaces so stdlib json is used for it.
+    '''
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=4, default=default)
+    if orjson:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, default=default)
+
+
+def load(f):
+    return loads(f.read())
+
+
+def dump(obj, f, indent=False):
+    f.write(dumps(obj, indent))
@@ -1,4 +1,5 @@
 import os
+import re
 from datetime import datetime, timedelta
 
 class GeeknewsDate:
@@ -56,6 +57,30 @@ class GeeknewsDate:
         else:
             return self
     
+    @classmethod
+    def parse(cls, text):
+        '''Parse date like 2025-01-09, 2025/1/9 or 20250109, return None if invalid.'''
+        components = re.findall(r'\d+', text or '')
+        if len(components) == 1 and len(components[0]) == 8:
+            value = components[0]
+            components = [value[:4], value[4:6], value[6:]]
+        if len(components) != 3:
+            return None
+        try:
+            dt = datetime(*map(int, components))
+        except ValueError:
+            return None
+        return cls(dt.year, dt.month, dt.day)
+    
+    def get_dates_until(self, end_date):
+        '''Dates from self to end_date (inclusive).'''
+        dates = []
+        date = self
+        while date.get_datetime() <= end_date.get_datetime():
+            dates.append(date)
+            date = date.get_next_date()
+        return dates
+    
     @classmethod
     def test_date(cls):
         return cls(2025, 1, 9)
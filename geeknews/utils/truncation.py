@@ -0,0 +1,185 @@
+import re
+import time
+from dataclasses import dataclass
+from geeknews.utils.logger import LOG
+
+# https://github.com/openai/tiktoken (in requirements.txt, regex approximation is used if it is missing)
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+WORD_RE = re.compile(r'\S+')
+# approximate BPE tokens: each CJK character, short pieces of letters and digits, each punctuation
+TOKEN_RE = re.compile(r'[぀-ヿ㐀-䶿一-鿿가-힯]|[^\W\d_぀-ヿ㐀-䶿一-鿿가-힯]{1,5}|\d{1,3}|[^\w\s]')
+OMITTED_PLACEHOLDER = '...(content omitted)...'
+# part of the budget used by approximate tokenizers, the rest is a safety margin for tokens they miss
+APPROXIMATE_BUDGET_RATIO = 0.85
+
+
+@dataclass(slots=True)
+class TruncateResult:
+    text: str
+    tokens_in: int
+    tokens_out: int
+
+    @property
+    def truncated(self):
+        return self.tokens_out < self.tokens_in
+
+
+class TextTokenizer:
+    '''
+    Tokens are regex matches, the regex runs over text once to count tokens, cut points are found by bounded scans.
+    exact: False if tokens only approximate the tokenizer of model.
+    '''
+
+    def __init__(self, name, pattern, exact=False):
+        self.name = name
+        self.pattern = pattern
+        self.exact = exact
+
+    def count(self, text):
+        return len(self.pattern.findall(text))
+
+    def cut(self, text, max_tokens, reserved_tokens=0):
+        '''Return token count, head and tail (None if text fits in max_tokens) with max_tokens - reserved_tokens in total.'''
+        token_count = self.count(text)
+        if token_count <= max_tokens:
+            return token_count, None, None
+
+        budget = max(max_tokens - reserved_tokens, 0)
+        head_count = budget - budget // 2
+        tail_count = budget // 2
+        head_end = self.get_head_end(text, head_count)
+        chars_per_token = head_end / head_count if head_count else len(text) / token_count
+        tail_start = self.get_tail_start(text, tail_count, head_end, chars_per_token)
+        return token_count, text[:head_end], text[tail_start:]
+
+    def get_head_end(self, text, head_count):
+        if head_count <= 0:
+            return 0
+        for index, match in enumerate(self.pattern.finditer(text)):
+            if index == head_count - 1:
+                return match.end()
+        return len(text)
+
+    def get_tail_start(self, text, tail_count, head_end, chars_per_token):
+        if tail_count <= 0:
+            return len(text)
+
+        # scan a window at the end of text, double it until it has enough tokens
+        window = int(tail_count * max(chars_per_token, 1) * 1.5) + 1
+        while True:
+            start = max(len(text) - window, head_end)
+            window_count = len(self.pattern.findall(text, start))
+            if window_count >= tail_count or start == head_end:
+                break
+            window *= 2
+
+        skip_count = max(window_count - tail_count, 0)
+        for index, match in enumerate(self.pattern.finditer(text, start)):
+            if index == skip_count:
+                return match.start()
+        return len(text)
+
+
+class TiktokenTokenizer(TextTokenizer):
+    '''Tokens of tiktoken encoding, text is encoded once. Exact only if the encoding is the one of model.'''
+
+    def __init__(self, encoding, exact=True):
+        super().__init__(f'tiktoken:{encoding.name}', None, exact)
+        self.encoding = encoding
+
+    def count(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def cut(self, text, max_tokens, reserved_tokens=0):
+        tokens = self.encoding.encode(text, disallowed_special=())
+        token_count = len(tokens)
+        if token_count <= max_tokens:
+            return token_count, None, None
+
+        budget = max(max_tokens - reserved_tokens, 0)
+        head_count = budget - budget // 2
+        tail_count = budget // 2
+        head = self.encoding.decode(tokens[:head_count])
+        tail = self.encoding.decode(tokens[token_count - tail_count:]) if tail_count else ''
+        return token_count, head, tail
+
+
+def get_tokenizer(model=None, by_words=False) -> TextTokenizer:
+    '''
+    Tokenizer of model:
+    - openai models: exact tokens of tiktoken encoding of model.
+    - other models (e.g. gemini, whose tokenizer is not public): approximated by o200k_base, see APPROXIMATE_BUDGET_RATIO.
+    - regex approximation if tiktoken is not installed.
+    '''
+    if by_words:
+        return TextTokenizer('words', WORD_RE, exact=True)
+    if tiktoken is None:
+        LOG.error('未安装tiktoken, 使用正则估算token')
+        return TextTokenizer('tokens', TOKEN_RE)
+    try:
+        try:
+            return TiktokenTokenizer(tiktoken.encoding_for_model(model or ''))
+        except KeyError:
+            LOG.info(f'{model}没有tiktoken编码, 使用o200k_base估算token')
+            return TiktokenTokenizer(tiktoken.get_encoding('o200k_base'), exact=False)
+    except Exception as e:
+        LOG.error(f'无法加载tiktoken编码, 使用正则估算token: {e}')
+        return TextTokenizer('tokens', TOKEN_RE)
+
+
+class TextTruncator:
+    '''
+    Truncate text to a token budget in linear time: keep head and tail spans and insert placeholder between.
+    The budget includes tokens of placeholder. Approximate tokenizers only use APPROXIMATE_BUDGET_RATIO of the budget.
+    '''
+
+    def __init__(self, tokenizer: TextTokenizer, placeholder=OMITTED_PLACEHOLDER):
+        self.tokenizer = tokenizer
+        self.placeholder = placeholder
+        self.placeholder_tokens = tokenizer.count(placeholder)
+
+    def get_budget(self, max_tokens):
+        if self.tokenizer.exact:
+            return max_tokens
+        return int(max_tokens * APPROXIMATE_BUDGET_RATIO)
+
+    def truncate(self, text, max_tokens) -> TruncateResult:
+        max_tokens = self.get_budget(max_tokens)
+        token_count, head, tail = self.tokenizer.cut(text, max_tokens, self.placeholder_tokens)
+        if head is None:
+            return TruncateResult(text, token_count, token_count)
+
+        separator = '\n\n' if '\n' in text else ' '
+        final_text = head.rstrip() + separator + self.placeholder + separator + tail.lstrip()
+        tokens_out = min(max_tokens, token_count)
+        return TruncateResult(final_text, token_count, tokens_out)
+
+
+def benchmark_truncation(size_mb=1, max_tokens=10000, repeat=3):
+    '''Truncate generated english and chinese texts of size_mb to max_tokens with each tokenizer.'''
+    paragraph_en = 'The quick brown fox jumps over the lazy dog, while 42 engineers benchmark tokenizers. '
+    paragraph_zh = '极客新闻每天整理黑客新闻的热门文章并生成中文摘要。'
+    size = int(size_mb * 1024 * 1024)
+    texts = {
+        'en': '\n'.join(paragraph_en * 10 for _ in range(size // (len(paragraph_en) * 10) + 1))[:size],
+        'zh': '\n'.join(paragraph_zh * 10 for _ in range(size // (len(paragraph_zh.encode('utf-8')) * 10) + 1)),
+    }
+
+    tokenizers = [get_tokenizer(by_words=True), TextTokenizer('tokens', TOKEN_RE)]
+    if tiktoken is not None:
+        tokenizers.append(get_tokenizer())
+
+    for tokenizer in tokenizers:
+        truncator = TextTruncator(tokenizer)
+        for lang, text in texts.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = truncator.truncate(text, max_tokens)
+            elapsed = (time.perf_counter() - start) / repeat
+            size_mb = len(text.encode('utf-8')) / 1024 / 1024
+            LOG.info(f'{tokenizer.name} {lang}: {size_mb:.2f} MB, {result.tokens_in} -> {result.tokens_out} tokens, {elapsed*1000:.1f} ms, {size_mb/elapsed:.1f} MB/s')